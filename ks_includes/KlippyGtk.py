@@ -6,6 +6,7 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gdk, GdkPixbuf, Gio, Gtk, Pango
+from ks_includes.iconcache import IconCache
 from ks_includes.widgets.scroll import CustomScrolledWindow
 
 
@@ -35,6 +36,9 @@ class KlippyGtk:
     def __init__(self, screen):
         self.screen = screen
         self.themedir = os.path.join(pathlib.Path(__file__).parent.resolve().parent, "styles", screen.theme, "images")
+        self.icons = IconCache(os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "KlipperScreen", "icons"
+        ))
         self.cursor = screen.show_cursor
         self.font_size_type = screen._config.get_main_config().get("font_size", "medium")
         self.width = screen.width
@@ -81,6 +85,7 @@ class KlippyGtk:
         self.keyboard_height = self.content_height * 0.5
         if self.ultra_tall:
             self.keyboard_height = self.keyboard_height * 0.5
+        self.icons.prerender(self.themedir, self.icon_sizes())
 
         self.color_list = {}  # This is set by screen.py init_style()
         for key in self.color_list:
@@ -122,17 +127,18 @@ class KlippyGtk:
 
     def update_themedir(self, theme):
         self.themedir = os.path.join(pathlib.Path(__file__).parent.resolve().parent, "styles", theme, "images")
+        self.icons.prerender(self.themedir, self.icon_sizes())
+
+    def icon_sizes(self):
+        # The sizes Button and Image use by default
+        button = self.img_scale * self.button_image_scale
+        return {(int(button), int(button)), (int(button * 1.4), int(button * 1.4)),
+                (int(self.img_width), int(self.img_height))}
 
     def PixbufFromIcon(self, filename, width=None, height=None):
         width = width if width is not None else self.img_width
         height = height if height is not None else self.img_height
-        filename = os.path.join(self.themedir, filename)
-        for ext in ["svg", "png"]:
-            file = f"{filename}.{ext}"
-            pixbuf = self.PixbufFromFile(file, int(width), int(height)) if os.path.exists(file) else None
-            if pixbuf is not None:
-                return pixbuf
-        return None
+        return self.icons.get(self.themedir, filename, int(width), int(height))
 
     @staticmethod
     def PixbufFromFile(filename, width=-1, height=-1):
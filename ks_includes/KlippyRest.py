@@ -1,6 +1,5 @@
 import logging
 import re
-import requests
 
 
 class KlippyRest:
@@ -37,6 +36,7 @@ class KlippyRest:
         url = f"{self.endpoint}/{method}"
         headers = {"x-api-key": self.api_key} if self.api_key else {}
         try:
+            import requests  # Deferred, it's slow to import on an SD card
             callee = getattr(requests, request_method)
             response = callee(url, json=json, data=data, headers=headers, timeout=timeout)
             response.raise_for_status()
@@ -5,7 +5,6 @@ import json
 import logging
 
 import gi
-import websocket
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib
@@ -61,6 +60,7 @@ class KlippyWebsocket(threading.Thread):
         self.reconnect_count += 1
 
         self.ws_url = f"{self.ws_proto}://{self._url}/websocket?token={self.api_key}"
+        import websocket  # Deferred, it's slow to import on an SD card
         self.ws = websocket.WebSocketApp(
             self.ws_url,
             on_close=self.on_close,
@@ -212,11 +212,13 @@ class MoonrakerApi:
             *args
         )
 
-    def object_subscription(self, updates):
+    def object_subscription(self, updates, callback=None, *args):
         logging.debug("Sending printer.objects.subscribe")
         return self._ws.send_method(
             "printer.objects.subscribe",
-            updates
+            updates,
+            callback,
+            *args
         )
 
     def power_device_off(self, device, callback=None, *args):
@@ -331,6 +333,33 @@ class MoonrakerApi:
             "printer.firmware_restart"
         )
 
+    def spoolman_proxy(self, request_method, path, callback=None, *args):
+        logging.debug(f"Sending server.spoolman.proxy {request_method} {path}")
+        return self._ws.send_method(
+            "server.spoolman.proxy",
+            {"request_method": request_method, "path": path},
+            callback,
+            *args
+        )
+
+    def spoolman_get_spool_id(self, callback=None, *args):
+        logging.debug("Sending server.spoolman.get_spool_id")
+        return self._ws.send_method(
+            "server.spoolman.get_spool_id",
+            {},
+            callback,
+            *args
+        )
+
+    def spoolman_set_spool_id(self, spool_id, callback=None, *args):
+        logging.debug(f"Sending server.spoolman.post_spool_id {spool_id}")
+        return self._ws.send_method(
+            "server.spoolman.post_spool_id",
+            {"spool_id": spool_id} if spool_id is not None else {},
+            callback,
+            *args
+        )
+
     def identify_client(self, version, api_key):
         logging.debug("Sending server.connection.identify")
         return self._ws.send_method(
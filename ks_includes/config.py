@@ -117,8 +117,6 @@ class KlipperScreenConfig:
         lang_path = os.path.join(klipperscreendir, "ks_includes", "locales")
         self.lang_list = [d for d in os.listdir(lang_path) if not os.path.isfile(os.path.join(lang_path, d))]
         self.lang_list.sort()
-        for lng in self.lang_list:
-            self.langs[lng] = gettext.translation('KlipperScreen', localedir=lang_path, languages=[lng], fallback=True)
 
         lang = self.get_main_config().get("language", "system_lang")
         logging.debug(f"Selected lang: {lang} OS lang: {locale.getlocale()[0]}")
@@ -136,11 +134,22 @@ class KlipperScreenConfig:
                     return language
         return next((language for language in self.lang_list if lang.startswith(language)), "en")
 
+    def get_translation(self, lang):
+        # Catalogues are parsed on demand, only the most recently used ones are kept
+        if lang in self.langs:
+            self.langs[lang] = self.langs.pop(lang)
+            return self.langs[lang]
+        if len(self.langs) >= 3:
+            del self.langs[next(iter(self.langs))]
+        lang_path = os.path.join(klipperscreendir, "ks_includes", "locales")
+        self.langs[lang] = gettext.translation('KlipperScreen', localedir=lang_path, languages=[lang], fallback=True)
+        return self.langs[lang]
+
     def install_language(self, lang):
         if lang not in self.lang_list:
             lang = self.find_language(lang)
         logging.info(f"Using lang {lang}")
-        self.lang = self.langs[lang]
+        self.lang = self.get_translation(lang)
         self.lang.install(names=['gettext', 'ngettext'])
 
     def validate_config(self, config, string="", remove=False):
@@ -161,15 +170,17 @@ class KlipperScreenConfig:
                 bools = (
                     'invert_x', 'invert_y', 'invert_z', '24htime', 'only_heaters', 'show_cursor', 'confirm_estop',
                     'autoclose_popups', 'use_dpms', 'use_default_menu', 'side_macro_shortcut', 'use-matchbox-keyboard',
-                    'show_heater_power', "show_scroll_steppers", "auto_open_extrude"
+                    'show_heater_power', "show_scroll_steppers", "auto_open_extrude", "preload_panels",
                 )
                 strs = (
                     'default_printer', 'language', 'print_sort_dir', 'theme', 'screen_blanking_printing', 'font_size',
                     'print_estimate_method', 'screen_blanking', "screen_on_devices", "screen_off_devices", 'print_view',
+                    'status_rate_limits', 'camera_mode',
                 )
                 numbers = (
                     'job_complete_timeout', 'job_error_timeout', 'move_speed_xy', 'move_speed_z',
-                    'print_estimate_compensation', 'width', 'height',
+                    'print_estimate_compensation', 'width', 'height', 'panel_cache_size',
+                    'camera_fps',
                 )
             elif section.startswith('printer '):
                 bools = (
@@ -488,6 +499,22 @@ class KlipperScreenConfig:
 
         return menu_items
 
+    def get_menu_panels(self):
+        # Panels referenced by any configured menu item
+        return list(dict.fromkeys(
+            self.config[section].get('panel')
+            for section in self.config.sections()
+            if section.startswith("menu ") and self.config[section].get('panel')
+        ))
+
+    def get_panel_menu_name(self, panel):
+        # Name of the first menu item that opens the panel, used as its title
+        return next((
+            self.config[section].get('name')
+            for section in self.config.sections()
+            if section.startswith("menu ") and self.config[section].get('panel') == panel
+        ), None)
+
     def get_menu_name(self, menu="__main", subsection=""):
         name = f"menu {menu} {subsection}" if subsection != "" else f"menu {menu}"
         return False if name not in self.config else self.config[name].get('name')
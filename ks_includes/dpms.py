@@ -0,0 +1,133 @@
+import ctypes
+import logging
+
+
+class DPMS_State:
+    Fail = -1
+    On = 0
+    Standby = 1
+    Suspend = 2
+    Off = 3
+
+
+class XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ("type", ctypes.c_int),
+        ("display", ctypes.c_void_p),
+        ("resourceid", ctypes.c_ulong),
+        ("serial", ctypes.c_ulong),
+        ("error_code", ctypes.c_ubyte),
+        ("request_code", ctypes.c_ubyte),
+        ("minor_code", ctypes.c_ubyte),
+    ]
+
+
+XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(XErrorEvent))
+
+
+class DisplayPower:
+    # Keeps one connection to the X display for every DPMS query and setting instead of running xset
+    def __init__(self, display_name=b':0'):
+        self.display_name = display_name
+        # None means libXext wasn't loaded yet, False that it failed to load
+        self.lib = None
+        self.display = None
+        self.capable = False
+        # Xlib's default error handler exits the process, errors on this connection are only logged
+        self.error_handler = XErrorHandler(self.x_error)
+        self.previous_handler = None
+        self.failed = False
+
+    def load(self):
+        try:
+            lib = ctypes.CDLL('libXext.so.6')
+        except OSError as e:
+            logging.error(f"Couldn't load DPMS library: {e}")
+            return False
+        except Exception as e:
+            logging.error(f"An unexpected error occurred: {e}")
+            return False
+        lib.XOpenDisplay.restype = ctypes.c_void_p
+        lib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        lib.XFlush.argtypes = [ctypes.c_void_p]
+        lib.XSetScreenSaver.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.DPMSQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
+        lib.DPMSCapable.argtypes = [ctypes.c_void_p]
+        lib.DPMSInfo.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_ushort), ctypes.POINTER(ctypes.c_ubyte)]
+        lib.DPMSEnable.argtypes = [ctypes.c_void_p]
+        lib.DPMSForceLevel.argtypes = [ctypes.c_void_p, ctypes.c_ushort]
+        lib.DPMSSetTimeouts.argtypes = [ctypes.c_void_p, ctypes.c_ushort, ctypes.c_ushort, ctypes.c_ushort]
+        lib.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.XSetErrorHandler.restype = ctypes.c_void_p
+        lib.XSetErrorHandler.argtypes = [XErrorHandler]
+        return lib
+
+    def x_error(self, display, event):
+        if display != self.display and self.previous_handler is not None:
+            # The handler is process wide, errors of GDK's connection are left to GDK
+            return self.previous_handler(display, event)
+        self.failed = True
+        error = event.contents
+        logging.error(f"DPMS request failed: X error {error.error_code} "
+                      f"(request {error.request_code}.{error.minor_code})")
+        return 0
+
+    def available(self):
+        if self.display is not None:
+            return True
+        if self.lib is None:
+            self.lib = self.load()
+        if not self.lib:
+            return False
+        display = self.lib.XOpenDisplay(self.display_name)
+        if not display:
+            logging.error(f"Couldn't open display {self.display_name.decode()}")
+            return False
+        self.display = display
+        previous = self.lib.XSetErrorHandler(self.error_handler)
+        self.previous_handler = XErrorHandler(previous) if previous else None
+        major_opcode, first_event = ctypes.c_int(), ctypes.c_int()
+        self.capable = bool(
+            self.lib.DPMSQueryExtension(self.display, ctypes.byref(major_opcode), ctypes.byref(first_event))
+            and self.lib.DPMSCapable(self.display)
+        )
+        logging.info(f"DPMS capable: {self.capable}")
+        return True
+
+    def get_state(self):
+        if not self.available() or not self.capable:
+            return DPMS_State.Fail
+        level, enabled = ctypes.c_ushort(), ctypes.c_ubyte()
+        if not self.lib.DPMSInfo(self.display, ctypes.byref(level), ctypes.byref(enabled)) or not enabled.value:
+            return DPMS_State.Fail
+        return level.value
+
+    def _send(self, request, *args):
+        if not self.available() or not self.capable:
+            return False
+        self.failed = False
+        getattr(self.lib, request)(self.display, *args)
+        # Waits for the server so errors are reported for this request
+        self.lib.XSync(self.display, 0)
+        return not self.failed
+
+    def enable(self):
+        return self._send("DPMSEnable")
+
+    def force_on(self):
+        # Forcing a level while DPMS is disabled is an X protocol error
+        if self.get_state() in (DPMS_State.Fail, DPMS_State.On):
+            return False
+        return self._send("DPMSForceLevel", DPMS_State.On)
+
+    def set_timeouts(self, standby, suspend, off):
+        # 0 disables a stage, the server rejects non zero stages that are shorter than the previous one
+        return self._send("DPMSSetTimeouts", *(min(max(int(t), 0), 65535) for t in (standby, suspend, off)))
+
+    def disable_screensaver(self):
+        # Same as xset s off, the server's own blanking is left to DPMS
+        if not self.available():
+            return False
+        self.lib.XSetScreenSaver(self.display, 0, 0, 2, 2)
+        self.lib.XFlush(self.display)
+        return True
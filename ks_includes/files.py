@@ -3,6 +3,7 @@ import os
 import gi
 
 gi.require_version("Gtk", "3.0")
+from ks_includes.thumbnails import ThumbnailExtractor
 
 
 class KlippyFiles:
@@ -12,11 +13,16 @@ class KlippyFiles:
         self.files = {}
         self.directories = []
         self.gcodes_path = None
+        self.thumbnails = ThumbnailExtractor(os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "KlipperScreen", "thumbs"
+        ))
+        self.extracting = {}
 
     def reinit(self):
         self.callbacks.clear()
         self.files.clear()
         self.directories.clear()
+        self.extracting.clear()
         self.gcodes_path = None
 
     def set_gcodes_path(self):
@@ -42,6 +48,12 @@ class KlippyFiles:
                 self.files[params['filename']]['path'] = params['filename']
             if "thumbnails" in self.files[params['filename']]:
                 self.files[params['filename']]['thumbnails'].sort(key=lambda y: y['size'], reverse=True)
+                gcode = None
+                if self.gcodes_path is not None:
+                    gcode = os.path.join(self.gcodes_path, params['filename'])
+                    if not os.access(gcode, os.R_OK):
+                        gcode = None
+                extract = False
                 for thumbnail in self.files[params['filename']]['thumbnails']:
                     thumbnail['local'] = False
                     if self.gcodes_path is not None:
@@ -52,16 +64,38 @@ class KlippyFiles:
                         if os.access(path, os.R_OK):
                             thumbnail['local'] = True
                             thumbnail['path'] = path
+                    if thumbnail['local'] is False and gcode is not None:
+                        # Taken from the gcode header instead of downloading it from moonraker
+                        path = self.thumbnails.find(gcode, thumbnail['width'], thumbnail['height'])
+                        if path is not None:
+                            thumbnail['local'] = True
+                            thumbnail['path'] = path
+                        else:
+                            extract = True
                     if thumbnail['local'] is False:
                         thumbnail['path'] = os.path.join(
                             os.path.dirname(params['filename']),
                             thumbnail['relative_path']
                         )
+                if extract and gcode not in self.extracting:
+                    self.extracting[gcode] = params['filename']
+                    self.thumbnails.extract(gcode, self.thumbnails_extracted)
             self._screen.process_update("notify_metadata_update", params)
             self.run_callbacks(
                 "modify_file", {'action': "modify_file", 'item': self.files[params['filename']]}
             )
 
+    def thumbnails_extracted(self, gcode, paths):
+        filename = self.extracting.pop(gcode, None)
+        if filename not in self.files or not paths:
+            return
+        for thumbnail in self.files[filename].get('thumbnails', []):
+            if not thumbnail['local'] and (thumbnail['width'], thumbnail['height']) in paths:
+                thumbnail['local'] = True
+                thumbnail['path'] = paths[(thumbnail['width'], thumbnail['height'])]
+        self._screen.process_update("notify_metadata_update", {'filename': filename})
+        self.run_callbacks("modify_file", {'action': "modify_file", 'item': self.files[filename]})
+
     def add_file(self, item):
         if 'path' not in item:
             logging.info(f"Error adding item, unknown path: {item}")
@@ -9,55 +9,42 @@ import time
 import traceback
 from queue import SimpleQueue as Queue
 
-import ctypes
-import struct
-
-dpms_loaded = False
-try:
-    ctypes.cdll.LoadLibrary('libXext.so.6')
-    libXext = ctypes.CDLL('libXext.so.6')
-
-    class DPMS_State:
-        Fail = -1
-        On = 0
-        Standby = 1
-        Suspend = 2
-        Off = 3
-
-    def get_DPMS_state(display_name_in_byte_string=b':0'):
-        state = DPMS_State.Fail
-        if not isinstance(display_name_in_byte_string, bytes):
-            raise TypeError("display_name_in_byte_string must be of type bytes")
-
-        display_name = ctypes.c_char_p(display_name_in_byte_string)
-        libXext.XOpenDisplay.restype = ctypes.c_void_p
-        display = ctypes.c_void_p(libXext.XOpenDisplay(display_name))
-
-        major_opcode_p = ctypes.create_string_buffer(8)
-        first_event_p = ctypes.create_string_buffer(8)
-
-        if display.value:
-            try:
-                if libXext.DPMSQueryExtension(display, major_opcode_p, first_event_p) \
-                        and libXext.DPMSCapable(display):
-                    onoff_p = ctypes.create_string_buffer(1)
-                    state_p = ctypes.create_string_buffer(2)
-                    if libXext.DPMSInfo(display, state_p, onoff_p):
-                        onoff = struct.unpack('B', onoff_p.raw)[0]
-                        if onoff:
-                            state = struct.unpack('H', state_p.raw)[0]
-            finally:
-                libXext.XCloseDisplay(display)
-        return state
-
-    dpms_loaded = True
-except OSError as e:
-    logging.error(f"Couldn't load DPMS library: {e}")
-except Exception as e:
-    logging.error(f"An unexpected error occurred: {e}")
+software_version = None
+version_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".version")
 
 
 def get_software_version():
+    global software_version
+    if software_version is None:
+        software_version = read_version_file() or write_version_file()
+    return software_version
+
+
+def read_version_file():
+    # The cached version is stale if the checkout changed after it was written
+    git_index = os.path.join(os.path.dirname(version_file), ".git", "index")
+    try:
+        if os.path.exists(git_index) and os.path.getmtime(git_index) > os.path.getmtime(version_file):
+            return None
+        with open(version_file) as file:
+            return file.read().strip() or None
+    except OSError:
+        return None
+
+
+def write_version_file():
+    # Called at install time and whenever the cached version is stale
+    version = git_describe()
+    if version != "?":
+        try:
+            with open(version_file, "w") as file:
+                file.write(f"{version}\n")
+        except OSError as e:
+            logging.debug(f"Couldn't cache the version: {e}")
+    return version
+
+
+def git_describe():
     prog = ('git', '-C', os.path.dirname(__file__), 'describe', '--always', '--tags', '--long', '--dirty')
     try:
         process = subprocess.Popen(prog, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -0,0 +1,325 @@
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+from contextlib import suppress
+from math import sqrt
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "KlipperScreen", "gcode")
+MOVES = {b"G0", b"G1", b"G2", b"G3"}
+# Callbacks of the loads running in a worker thread by (filename, classes), only used in the GTK thread
+loading = {}
+
+
+def cache_path(path, suffix):
+    return os.path.join(CACHE_DIR, hashlib.sha1(path.encode()).hexdigest() + suffix)
+
+
+def parse_moves(mm):
+    # Streams the gcode and yields (offset after the line, x0, y0, z0, x1, y1, z1, extruded, speed in mm/s, dwell)
+    # arcs are taken as straight lines to their end point, good enough for timing and previews
+    x = y = z = e = 0.0
+    speed = 25.0
+    absolute = absolute_e = True
+    for line in iter(mm.readline, b""):
+        code = line.split(b";", 1)[0].split()
+        if not code:
+            continue
+        cmd = code[0].upper()
+        if cmd in MOVES:
+            nx, ny, nz, ne = x, y, z, e
+            for word in code[1:]:
+                axis = word[:1].upper()
+                try:
+                    value = float(word[1:])
+                except ValueError:
+                    continue
+                if axis == b"X":
+                    nx = value if absolute else x + value
+                elif axis == b"Y":
+                    ny = value if absolute else y + value
+                elif axis == b"Z":
+                    nz = value if absolute else z + value
+                elif axis == b"E":
+                    ne = value if absolute and absolute_e else e + value
+                elif axis == b"F" and value > 0:
+                    speed = value / 60
+            yield mm.tell(), x, y, z, nx, ny, nz, ne - e, speed, 0
+            x, y, z, e = nx, ny, nz, ne
+        elif cmd == b"G90":
+            absolute = True
+        elif cmd == b"G91":
+            absolute = False
+        elif cmd == b"M82":
+            absolute_e = True
+        elif cmd == b"M83":
+            absolute_e = False
+        elif cmd == b"G92":
+            for word in code[1:]:
+                axis = word[:1].upper()
+                try:
+                    value = float(word[1:])
+                except ValueError:
+                    continue
+                if axis == b"X":
+                    x = value
+                elif axis == b"Y":
+                    y = value
+                elif axis == b"Z":
+                    z = value
+                elif axis == b"E":
+                    e = value
+        elif cmd == b"G4":
+            dwell = 0
+            for word in code[1:]:
+                try:
+                    if word[:1].upper() == b"P":
+                        dwell += float(word[1:]) / 1000
+                    elif word[:1].upper() == b"S":
+                        dwell += float(word[1:])
+                except ValueError:
+                    continue
+            yield mm.tell(), x, y, z, x, y, z, 0, speed, dwell
+
+
+class LayerTracker:
+    # Finds where layers start from the extruding moves. A higher Z starts a layer once the next extruding
+    # move holds it, spiral (vase) moves rise on every move so they start one each time Z rose by a layer height
+    EPSILON = 1e-6
+
+    def __init__(self):
+        self.z = -1.0
+        self.height = 0.0
+        self.pending = None
+
+    def update(self, z, token):
+        # Returns (token, z) of the move that started a layer, or None
+        if z <= self.z + self.EPSILON:
+            self.pending = None
+            return None
+        if self.pending is not None and abs(z - self.pending[1]) <= self.EPSILON:
+            return self.confirm(*self.pending)
+        if self.height > 0 and z - self.z >= self.height - self.EPSILON:
+            return self.confirm(token, z)
+        self.pending = (token, z)
+        return None
+
+    def confirm(self, token, z):
+        self.height = z - max(self.z, 0)
+        self.z = z
+        self.pending = None
+        return token, z
+
+    def finish(self):
+        # A last layer of a single move
+        return self.confirm(*self.pending) if self.pending is not None else None
+
+
+class CachedGcodeData:
+    # Data built from the moves of a gcode, stored as typed arrays and cached on disk per path,
+    # the cache is discarded when the mtime or the size of the gcode changes
+    MAGIC = b"KSGC"
+    VERSION = 1
+    SUFFIX = ".dat"
+    HEADER = struct.Struct("<4sIdQ")
+    COUNT = struct.Struct("<Q")
+
+    def arrays(self):
+        # The arrays that are saved and loaded, in order
+        return ()
+
+    def start(self):
+        # Sets up the state of a build, the arrays are empty
+        pass
+
+    def add_move(self, offset, x0, y0, z0, x1, y1, z1, extruded, speed, dwell):
+        # Called for every move of the gcode in file order, offset is the byte offset of the move
+        pass
+
+    def finish(self, size):
+        # Called after the last move with the size of the gcode
+        pass
+
+    def save(self, path, mtime, size):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique temporary file, the same gcode may be cached by other threads at the same time
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.HEADER.pack(self.MAGIC, self.VERSION, mtime, size))
+                for values in self.arrays():
+                    f.write(self.COUNT.pack(len(values)))
+                    values.tofile(f)
+            os.replace(tmp, path)
+        except OSError:
+            with suppress(OSError):
+                os.remove(tmp)
+            raise
+
+    def load(self, path, mtime, size):
+        with open(path, "rb") as f:
+            if self.HEADER.unpack(f.read(self.HEADER.size)) != (self.MAGIC, self.VERSION, mtime, size):
+                return False
+            for values in self.arrays():
+                values.fromfile(f, self.COUNT.unpack(f.read(self.COUNT.size))[0])
+        return True
+
+
+def open_data(filename, classes):
+    # Reads the cached data of the file for each class, what isn't cached is built from a single pass
+    # over the gcode, this blocks so it should run in a worker thread
+    stat = os.stat(filename)
+    datas = []
+    missing = []
+    for cls in classes:
+        data = cls()
+        try:
+            if data.load(cache_path(filename, cls.SUFFIX), stat.st_mtime, stat.st_size):
+                datas.append(data)
+                continue
+        except (OSError, EOFError, struct.error):
+            pass
+        data = cls()
+        data.start()
+        datas.append(data)
+        missing.append(data)
+    if not missing:
+        return tuple(datas)
+    if stat.st_size == 0:
+        # An empty file can't be mapped and has no moves
+        for data in missing:
+            data.finish(0)
+        return tuple(datas)
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for move in parse_moves(mm):
+            for data in missing:
+                data.add_move(*move)
+        for data in missing:
+            data.finish(len(mm))
+    for data in missing:
+        try:
+            data.save(cache_path(filename, data.SUFFIX), stat.st_mtime, stat.st_size)
+        except OSError as e:
+            logging.debug(f"Unable to cache {type(data).__name__} of {filename}: {e}")
+    return tuple(datas)
+
+
+class GcodeIndex(CachedGcodeData):
+    # Maps byte offsets of a gcode file to the estimated time spent up to there, the layer and the Z height.
+    # A point is recorded at every layer change and at most every STEP bytes, so the index stays small
+    STEP = 4096
+    MAGIC = b"KSGI"
+    VERSION = 3
+    SUFFIX = ".idx"
+
+    def __init__(self):
+        self.offsets = array("Q")
+        self.times = array("d")
+        self.layers = array("I")
+        self.heights = array("f")
+
+    def arrays(self):
+        return self.offsets, self.times, self.layers, self.heights
+
+    @property
+    def total_time(self):
+        return self.times[-1] if self.times else 0
+
+    @property
+    def total_layers(self):
+        return self.layers[-1] if self.layers else 0
+
+    def add(self, offset, time, layer, height):
+        self.offsets.append(offset)
+        self.times.append(time)
+        self.layers.append(layer)
+        self.heights.append(height)
+
+    def start(self):
+        self.time = 0.0
+        self.layer = 0
+        self.layer_z = 0.0
+        self.last = 0
+        self.previous = (0, 0.0)
+        self.tracker = LayerTracker()
+        self.add(0, 0, 0, 0)
+
+    def add_move(self, offset, x0, y0, z0, x1, y1, z1, extruded, speed, dwell):
+        distance = sqrt((x1 - x0) ** 2 + (y1 - y0) ** 2 + (z1 - z0) ** 2) or abs(extruded)
+        if extruded > 0 and (x1 != x0 or y1 != y0):
+            # The layer starts where the previous move ended
+            started = self.tracker.update(z1, self.previous)
+            if started is not None:
+                self.add_layer(*started)
+        self.time += distance / speed + dwell
+        if offset - self.last >= self.STEP:
+            self.add(offset, self.time, self.layer, self.layer_z)
+            self.last = offset
+        self.previous = (offset, self.time)
+
+    def add_layer(self, token, z):
+        offset, time = token
+        self.layer += 1
+        self.layer_z = z
+        # Points recorded while the layer wasn't confirmed yet belong to it
+        moved = []
+        while len(self.offsets) > 1 and self.offsets[-1] > offset:
+            moved.append((self.offsets.pop(), self.times.pop()))
+            self.layers.pop()
+            self.heights.pop()
+        self.add(offset, time, self.layer, z)
+        for point in reversed(moved):
+            self.add(*point, self.layer, z)
+
+    def finish(self, size):
+        started = self.tracker.finish()
+        if started is not None:
+            self.add_layer(*started)
+        self.add(size, self.time, self.layer, self.layer_z)
+        logging.info(f"Indexed gcode: {self.total_layers} layers, {len(self.offsets)} points")
+
+    def lookup(self, position):
+        # Returns (fraction of the estimated time, layer, z) at a byte offset
+        if len(self.offsets) < 2 or self.total_time <= 0:
+            return 0, 0, 0
+        i = min(max(bisect_right(self.offsets, position) - 1, 0), len(self.offsets) - 2)
+        span = self.offsets[i + 1] - self.offsets[i]
+        ratio = min(max((position - self.offsets[i]) / span, 0), 1) if span else 0
+        time = self.times[i] + (self.times[i + 1] - self.times[i]) * ratio
+        return time / self.total_time, self.layers[i], self.heights[i]
+
+
+def load_file(filename, classes, callback):
+    # callback(filename, datas) is called in the GTK thread with the data of each class, or Nones if the file
+    # couldn't be read. A load of the same file and classes that is already running is shared
+    key = (filename, tuple(classes))
+    if key in loading:
+        loading[key].append(callback)
+        return
+    loading[key] = [callback]
+
+    def run():
+        try:
+            datas = open_data(filename, key[1])
+        except Exception as e:
+            logging.debug(f"Unable to read {filename}: {e}")
+            datas = (None,) * len(key[1])
+        GLib.idle_add(loaded, key, datas)
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def loaded(key, datas):
+    for callback in loading.pop(key, []):
+        callback(key[0], datas)
+    return False
@@ -0,0 +1,75 @@
+import logging
+from array import array
+from bisect import bisect_right
+
+from ks_includes.gcodeindex import CachedGcodeData, GcodeIndex, LayerTracker
+
+
+class LayerStore(CachedGcodeData):
+    # Extruding moves of a gcode grouped by layer, segments are stored flat as x0, y0, x1, y1
+    # and layer n spans segments layer_start[n] to layer_start[n + 1]
+    MAGIC = b"KSGL"
+    VERSION = 2
+    SUFFIX = ".lyr"
+
+    def __init__(self):
+        self.segments = array("f")
+        self.layer_start = array("I")
+        self.layer_offset = array("Q")
+        self.layer_z = array("f")
+        # min_x, min_y, max_x, max_y of the segments, empty if there are none
+        self.bounds = array("f")
+
+    def arrays(self):
+        return self.segments, self.layer_start, self.layer_offset, self.layer_z, self.bounds
+
+    @property
+    def layers(self):
+        return max(len(self.layer_start) - 1, 0)
+
+    def start(self):
+        self.tracker = LayerTracker()
+        self.start_offset = 0
+        self.min_x = self.min_y = float("inf")
+        self.max_x = self.max_y = float("-inf")
+
+    def add_move(self, offset, x0, y0, z0, x1, y1, z1, extruded, speed, dwell):
+        if extruded <= 0 or (x1 == x0 and y1 == y0):
+            return
+        started = self.tracker.update(z1, (len(self.segments) // 4, self.start_offset))
+        if started is not None:
+            self.add_layer(*started)
+        self.segments.extend((x0, y0, x1, y1))
+        self.min_x, self.max_x = min(self.min_x, x0, x1), max(self.max_x, x0, x1)
+        self.min_y, self.max_y = min(self.min_y, y0, y1), max(self.max_y, y0, y1)
+        self.start_offset = offset
+
+    def add_layer(self, token, z):
+        # Whatever was extruded before the first layer, like a purge line, is part of it
+        start, offset = token if self.layer_start else (0, 0)
+        self.layer_start.append(start)
+        self.layer_offset.append(offset)
+        self.layer_z.append(z)
+
+    def finish(self, size):
+        started = self.tracker.finish()
+        if started is not None:
+            self.add_layer(*started)
+        self.layer_start.append(len(self.segments) // 4)
+        if self.segments:
+            self.bounds.extend((self.min_x, self.min_y, self.max_x, self.max_y))
+        logging.info(f"Parsed gcode preview: {self.layers} layers, {len(self.segments) // 4} segments")
+
+    def layer(self, n):
+        # Returns the flat segments of layer n (0 based)
+        if not 0 <= n < self.layers:
+            return self.segments[0:0]
+        return self.segments[self.layer_start[n] * 4:self.layer_start[n + 1] * 4]
+
+    def layer_at(self, position):
+        # Returns the layer being printed at a byte offset of the file
+        return max(bisect_right(self.layer_offset, position) - 1, 0)
+
+
+# Everything built from a local gcode, loaded together so the print dialog and the job status share the parse
+GCODE_DATA = (GcodeIndex, LayerStore)
@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from queue import SimpleQueue as Queue
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf
+
+
+class IconCache:
+    def __init__(self, cache_dir):
+        # Pixbufs are shared by every widget showing the same icon at the same size
+        self.pixbufs = {}
+        # Rasterized svgs are also stored as png in cache_dir/theme/WxH/ and reused across restarts
+        self.cache_dir = cache_dir
+        self.jobs = Queue()
+        self.worker = None
+
+    def get(self, themedir, name, width, height):
+        key = (themedir, name, width, height)
+        if key not in self.pixbufs:
+            self.pixbufs[key] = self.load(themedir, name, width, height)
+        return self.pixbufs[key]
+
+    def cached_path(self, themedir, name, width, height):
+        if os.sep in name or name.startswith("."):
+            # Icons outside the theme are not cached on disk
+            return None
+        theme = os.path.basename(os.path.dirname(themedir))
+        return os.path.join(self.cache_dir, theme, f"{width}x{height}", f"{name}.png")
+
+    @staticmethod
+    def is_fresh(cached, source):
+        try:
+            return os.path.getmtime(cached) >= os.path.getmtime(source)
+        except OSError:
+            return False
+
+    def load(self, themedir, name, width, height):
+        svg = os.path.join(themedir, f"{name}.svg")
+        if not os.path.exists(svg):
+            png = os.path.join(themedir, f"{name}.png")
+            return self.rasterize(png, width, height) if os.path.exists(png) else None
+        cached = self.cached_path(themedir, name, width, height)
+        if cached is not None and self.is_fresh(cached, svg):
+            try:
+                return GdkPixbuf.Pixbuf.new_from_file(cached)
+            except Exception as e:
+                logging.debug(f"Discarding cached icon {cached}: {e}")
+        pixbuf = self.rasterize(svg, width, height)
+        if pixbuf is not None and cached is not None:
+            self.queue(self.save, pixbuf, cached)
+        return pixbuf
+
+    @staticmethod
+    def rasterize(filename, width, height):
+        try:
+            return GdkPixbuf.Pixbuf.new_from_file_at_size(filename, width, height)
+        except Exception as e:
+            logging.exception(e)
+            logging.error(f"Unable to find image {filename}")
+            return None
+
+    def prerender(self, themedir, sizes):
+        # Fills the disk cache for every icon of the theme in the background
+        self.queue(self.render_theme, themedir, sizes)
+
+    def render_theme(self, themedir, sizes):
+        try:
+            names = [file[:-4] for file in os.listdir(themedir) if file.endswith(".svg")]
+        except OSError:
+            return
+        rendered = 0
+        for width, height in sizes:
+            for name in names:
+                cached = self.cached_path(themedir, name, width, height)
+                svg = os.path.join(themedir, f"{name}.svg")
+                if self.is_fresh(cached, svg):
+                    continue
+                try:
+                    pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(svg, width, height)
+                except Exception as e:
+                    logging.debug(f"Unable to prerender {svg}: {e}")
+                    continue
+                self.save(pixbuf, cached)
+                rendered += 1
+        if rendered:
+            logging.info(f"Prerendered {rendered} icons of {themedir}")
+
+    @staticmethod
+    def save(pixbuf, path):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Written aside and renamed so a partial file is never loaded
+            pixbuf.savev(f"{path}.tmp", "png", [], [])
+            os.replace(f"{path}.tmp", path)
+        except Exception as e:
+            logging.debug(f"Unable to cache icon {path}: {e}")
+
+    def queue(self, job, *args):
+        self.jobs.put((job, args))
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.run_jobs, daemon=True)
+            self.worker.start()
+
+    def run_jobs(self):
+        while True:
+            job, args = self.jobs.get()
+            job(*args)
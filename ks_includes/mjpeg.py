@@ -0,0 +1,143 @@
+import logging
+import threading
+from time import monotonic
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GdkPixbuf, GLib
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+# A stream that doesn't produce a complete frame within this many bytes is resynchronized
+MAX_BUFFER = 4 * 1024 * 1024
+ROTATIONS = {
+    90: GdkPixbuf.PixbufRotation.CLOCKWISE,
+    180: GdkPixbuf.PixbufRotation.UPSIDEDOWN,
+    270: GdkPixbuf.PixbufRotation.COUNTERCLOCKWISE,
+}
+
+
+class FrameBuffers:
+    # Frames are scaled into two pixbufs that are reused, one is drawn while the other is being written.
+    # Each reader thread has its own, so a restarted reader never writes into a frame that is shown
+    def __init__(self):
+        self.buffers = [None, None]
+        self.back = 0
+
+    def fit(self, pixbuf, size):
+        if size is None:
+            return pixbuf
+        scale = min(size[0] / pixbuf.get_width(), size[1] / pixbuf.get_height())
+        width, height = int(pixbuf.get_width() * scale), int(pixbuf.get_height() * scale)
+        if width < 1 or height < 1:
+            return pixbuf
+        buffer = self.buffers[self.back]
+        if buffer is None or buffer.get_width() != width or buffer.get_height() != height:
+            buffer = GdkPixbuf.Pixbuf.new(GdkPixbuf.Colorspace.RGB, pixbuf.get_has_alpha(), 8, width, height)
+            self.buffers[self.back] = buffer
+        pixbuf.scale(buffer, 0, 0, width, height, 0, 0, scale, scale, GdkPixbuf.InterpType.BILINEAR)
+        self.back = 1 - self.back
+        return buffer
+
+
+class MjpegReader:
+    # Fetches a webcam in a worker thread and hands the frames to the GTK thread already scaled,
+    # frames that come faster than fps or while the previous one wasn't drawn yet are dropped
+    def __init__(self, on_frame, snapshot_url=None, stream_url=None, fps=5, flip_h=False, flip_v=False, rotation=0):
+        self.on_frame = on_frame
+        self.snapshot_url = snapshot_url
+        self.stream_url = stream_url
+        self.interval = 1 / max(fps, 0.1)
+        self.flip_h = flip_h
+        self.flip_v = flip_v
+        self.rotation = ROTATIONS.get(int(rotation) % 360)
+        self.size = None
+        self.pending = False
+        self.stopped = None
+
+    def start(self):
+        if self.stopped is not None:
+            return
+        self.pending = False
+        self.stopped = threading.Event()
+        threading.Thread(target=self.run, args=(self.stopped, FrameBuffers()), daemon=True).start()
+
+    def stop(self):
+        if self.stopped is not None:
+            self.stopped.set()
+            self.stopped = None
+
+    def set_size(self, width, height):
+        self.size = (width, height)
+
+    def run(self, stopped, buffers):
+        import requests  # Deferred, only needed once a camera is shown
+        session = requests.Session()
+        while not stopped.is_set():
+            try:
+                if self.snapshot_url:
+                    self.poll(session, stopped, buffers)
+                else:
+                    self.stream(session, stopped, buffers)
+            except Exception as e:
+                logging.debug(f"Camera {self.snapshot_url or self.stream_url} failed: {e}")
+                stopped.wait(2)
+        session.close()
+
+    def poll(self, session, stopped, buffers):
+        while not stopped.is_set():
+            start = monotonic()
+            if not self.pending:
+                response = session.get(self.snapshot_url, timeout=5)
+                response.raise_for_status()
+                self.decode(response.content, stopped, buffers)
+            stopped.wait(max(self.interval - (monotonic() - start), 0))
+
+    def stream(self, session, stopped, buffers):
+        with session.get(self.stream_url, stream=True, timeout=5) as response:
+            response.raise_for_status()
+            data = b""
+            next_frame = 0
+            for chunk in response.iter_content(chunk_size=65536):
+                if stopped.is_set():
+                    return
+                data += chunk
+                end = data.rfind(EOI)
+                if end < 0:
+                    if len(data) > MAX_BUFFER:
+                        data = b""
+                    continue
+                # Only the newest complete frame is kept, anything older is stale
+                start = data.rfind(SOI, 0, end)
+                frame = data[start:end + 2] if start >= 0 else None
+                data = data[end + 2:]
+                if frame and not self.pending and monotonic() >= next_frame:
+                    next_frame = monotonic() + self.interval
+                    self.decode(frame, stopped, buffers)
+
+    def decode(self, jpeg, stopped, buffers):
+        loader = GdkPixbuf.PixbufLoader()
+        loader.write(jpeg)
+        loader.close()
+        pixbuf = loader.get_pixbuf()
+        if pixbuf is None:
+            return
+        if self.flip_h:
+            pixbuf = pixbuf.flip(True)
+        if self.flip_v:
+            pixbuf = pixbuf.flip(False)
+        if self.rotation is not None:
+            pixbuf = pixbuf.rotate_simple(self.rotation)
+        if stopped.is_set():
+            return
+        self.pending = True
+        GLib.idle_add(self.deliver, stopped, buffers.fit(pixbuf, self.size))
+
+    def deliver(self, stopped, pixbuf):
+        # Frames of a reader that was stopped, maybe restarted since, are dropped
+        if stopped is not self.stopped:
+            return False
+        self.pending = False
+        self.on_frame(pixbuf)
+        return False
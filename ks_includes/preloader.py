@@ -0,0 +1,42 @@
+import logging
+from time import monotonic
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+
+class PanelPreloader:
+    def __init__(self, budget=0.02):
+        # budget is the time in seconds a single idle slice may spend before yielding to the main loop
+        self.budget = budget
+        self.tasks = []
+        self.idle_source = None
+
+    def start(self, tasks):
+        # tasks: [(name, callable)] run in order while the main loop is idle
+        self.cancel()
+        self.tasks = list(tasks)
+        if self.tasks:
+            self.idle_source = GLib.idle_add(self.run_slice, priority=GLib.PRIORITY_LOW)
+
+    def run_slice(self):
+        deadline = monotonic() + self.budget
+        while self.tasks and monotonic() < deadline:
+            name, task = self.tasks.pop(0)
+            try:
+                task()
+            except Exception as e:
+                logging.debug(f"Unable to preload {name}: {e}")
+        if self.tasks:
+            return True
+        logging.debug("Preloading finished")
+        self.idle_source = None
+        return False
+
+    def cancel(self):
+        if self.idle_source is not None:
+            GLib.source_remove(self.idle_source)
+            self.idle_source = None
+        self.tasks.clear()
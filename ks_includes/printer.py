@@ -6,12 +6,13 @@ from gi.repository import GLib
 
 
 class Printer:
-    def __init__(self, state_cb, state_callbacks):
+    def __init__(self, state_cb, state_callbacks, timers):
         self.config = {}
         self.data = {}
         self.state = "disconnected"
         self.state_cb = state_cb
         self.state_callbacks = state_callbacks
+        self.timers = timers
         self.power_devices = {}
         self.tools = []
         self.extrudercount = 0
@@ -26,8 +27,16 @@ class Printer:
         self.cameras = []
         self.available_commands = {}
         self.spoolman = False
+        self.spoolman_catalogue = None
         self.temp_devices = self.sensors = None
         self.system_info = {}
+        self.observers = {}
+        self.changed = {}
+        self.notify_idle = None
+        self.sections = {}
+        self.macros = {}
+        self.status_version = 0
+        self.status_data = None
 
     def reinit(self, printer_info, data):
         self.config = data['configfile']['config']
@@ -45,6 +54,9 @@ class Printer:
         self.temp_devices = self.sensors = None
         self.stop_tempstore_updates()
         self.system_info.clear()
+        self.sections.clear()
+        self.macros.clear()
+        self.index_sections(self.config)
 
         for x in self.config.keys():
             # Support for hiding devices by name
@@ -89,6 +101,7 @@ class Printer:
                 self.ledcount += 1
 
         self.tools = sorted(self.tools)
+        self.status_changed()
         self.log_counts(printer_info)
         self.process_update(data)
 
@@ -101,9 +114,18 @@ class Printer:
         logging.info(f"# PWM tools: {self.pwm_tools_count}")
         logging.info(f"# Leds: {self.ledcount}")
 
+    def index_sections(self, config):
+        # Sections are indexed by type, the first word of the section name
+        for name in config:
+            section_type = name.split(" ", 1)[0]
+            # dict keys keep the config order without duplicates
+            self.sections.setdefault(section_type, {})[name] = None
+            if section_type == "gcode_macro":
+                self.macros[name[12:].strip()] = self.config[name]
+
     def stop_tempstore_updates(self):
         if self.store_timeout is not None:
-            GLib.source_remove(self.store_timeout)
+            self.timers.remove(self.store_timeout)
             self.store_timeout = None
 
     def process_update(self, data):
@@ -113,13 +135,44 @@ class Printer:
         for x in data:
             if x == "configfile" and 'config' in data[x]:
                 self.config.update(data[x]['config'])
+                self.index_sections(data[x]['config'])
+                self.status_changed()
             if x not in self.data:
                 self.data[x] = {}
+            for field in data[x]:
+                if (x, field) in self.observers and self.data[x].get(field) != data[x][field]:
+                    self.changed[(x, field)] = data[x][field]
             self.data[x].update(data[x])
 
+        if self.changed and self.notify_idle is None:
+            # Changes are batched and delivered once per main loop iteration
+            self.notify_idle = GLib.idle_add(self.notify_observers)
+
         if "webhooks" in data or "print_stats" in data or "idle_timeout" in data:
             self.process_status_update()
 
+    def add_observer(self, stat, substat, callback):
+        # callback(stat, substat, value) is called only when the value changes
+        callbacks = self.observers.setdefault((stat, substat), [])
+        if callback not in callbacks:
+            callbacks.append(callback)
+
+    def remove_observer(self, stat, substat, callback):
+        callbacks = self.observers.get((stat, substat), [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if not callbacks:
+            self.observers.pop((stat, substat), None)
+            self.changed.pop((stat, substat), None)
+
+    def notify_observers(self):
+        self.notify_idle = None
+        changed, self.changed = self.changed, {}
+        for (stat, substat), value in changed.items():
+            for callback in list(self.observers.get((stat, substat), [])):
+                callback(stat, substat, value)
+        return False
+
     def evaluate_state(self):
         # webhooks states: startup, ready, shutdown, error
         # print_stats: standby, printing, paused, error, complete
@@ -148,6 +201,7 @@ class Printer:
         if state != self.state:
             logging.debug(f"Changing state from '{self.state}' to '{state}'")
             self.state = state
+            self.status_changed()
         if self.state_callbacks[state] is not None:
             logging.debug(f"Adding callback for state: {state}")
             GLib.idle_add(self.state_cb, state, self.state_callbacks[state])
@@ -161,20 +215,34 @@ class Printer:
                 "status": "on" if x['status'] == "on" else "off"
             }
         logging.debug(f"Power devices: {self.power_devices}")
+        self.status_changed()
 
     def configure_cameras(self, data):
         self.cameras = data
         logging.debug(f"Cameras: {self.cameras}")
+        self.status_changed()
 
     def get_config_section_list(self, search=""):
-        if self.config is not None:
-            return [i for i in list(self.config) if i.startswith(search)] if hasattr(self, "config") else []
-        return []
+        if not self.config:
+            return []
+        if not search:
+            return list(self.config)
+        section_type, separator, _ = search.partition(" ")
+        if separator:
+            return [i for i in self.sections.get(section_type, {}) if i.startswith(search)]
+        return [
+            i
+            for indexed_type, names in self.sections.items()
+            if indexed_type.startswith(section_type)
+            for i in names
+        ]
 
     def get_config_section(self, section):
         return self.config[section] if section in self.config else False
 
     def get_macro(self, macro):
+        if macro in self.macros:
+            return self.macros[macro]
         return next(
             (
                 self.config[key]
@@ -199,15 +267,13 @@ class Printer:
         return self.get_config_section_list("output_pin ")
 
     def get_gcode_macros(self):
-        macros = []
-        for macro in self.get_config_section_list("gcode_macro "):
-            macro = macro[12:].strip()
-            if macro.startswith("_") or macro.upper() in ('LOAD_FILAMENT', 'UNLOAD_FILAMENT'):
-                continue
-            if self.get_macro(macro) and "rename_existing" in self.get_macro(macro):
-                continue
-            macros.append(macro)
-        return macros
+        return [
+            macro
+            for macro, section in self.macros.items()
+            if not macro.startswith("_")
+            and macro.upper() not in ('LOAD_FILAMENT', 'UNLOAD_FILAMENT')
+            and "rename_existing" not in section
+        ]
 
     def get_heaters(self):
         heaters = self.get_config_section_list("heater_generic ")
@@ -235,8 +301,16 @@ class Printer:
                 return self.get_config_section(probe_type)
         return None
 
+    def status_changed(self):
+        # Invalidates get_printer_status_data and anything rendered from it
+        self.status_version += 1
+        self.status_data = None
+
     def get_printer_status_data(self):
-        return {
+        if self.status_data is not None:
+            return self.status_data
+        macros = self.get_gcode_macros()
+        self.status_data = {
             "moonraker": {
                 "power_devices": {"count": len(self.get_power_devices())},
                 "cameras": {"count": len(self.cameras)},
@@ -249,11 +323,12 @@ class Printer:
                 "fans": {"count": self.fancount},
                 "output_pins": {"count": self.output_pin_count},
                 "pwm_tools": {"count": self.pwm_tools_count},
-                "gcode_macros": {"count": len(self.get_gcode_macros()), "list": self.get_gcode_macros()},
+                "gcode_macros": {"count": len(macros), "list": macros},
                 "leds": {"count": self.ledcount},
                 "config_sections": list(self.config.keys()),
             }
         }
+        return self.status_data
 
     def get_leds(self):
         return [
@@ -383,10 +458,10 @@ class Printer:
                         self.tempstore[device][x].insert(0, 0)
         logging.info(f"Temp store: {list(self.tempstore)}")
         if not self.store_timeout:
-            self.store_timeout = GLib.timeout_add_seconds(1, self._update_temp_store)
+            self.store_timeout = self.timers.add(1, self._update_temp_store)
 
     def config_section_exists(self, section):
-        return section in self.get_config_section_list()
+        return section in self.config
 
     def _update_temp_store(self):
         if self.tempstore is None:
@@ -404,3 +479,4 @@ class Printer:
     def enable_spoolman(self):
         logging.info("Enabling Spoolman")
         self.spoolman = True
+        self.status_changed()
@@ -0,0 +1,98 @@
+import logging
+from time import monotonic
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+DEFAULT_LIMITS = "motion_report.live_position: 2, motion_report.live_velocity: 2, " \
+                 "motion_report.live_extruder_velocity: 2"
+
+
+class StatusRateLimiter:
+    def __init__(self, callback, limits=None):
+        # callback receives the fields that were held back once their interval has elapsed
+        self.callback = callback
+        self.intervals = {}
+        self.last_sent = {}
+        self.pending = {}
+        self.listeners = {}
+        self.flush_timeout = None
+        if limits:
+            self.set_limits(limits)
+
+    @staticmethod
+    def parse_limits(value):
+        # "object.field: hz, object.field: hz" -> {(object, field): hz}
+        limits = {}
+        for item in value.split(','):
+            if not item.strip():
+                continue
+            try:
+                name, hz = item.rsplit(':', 1)
+                obj, field = name.strip().rsplit('.', 1)
+                limits[(obj, field)] = float(hz)
+            except ValueError:
+                logging.error(f"Invalid rate limit: {item.strip()}")
+        return limits
+
+    def set_limits(self, limits):
+        self.intervals = {key: 1 / hz for key, hz in limits.items() if hz > 0}
+        logging.info(f"Status rate limits: {limits}")
+
+    def add_listener(self, obj, field, callback):
+        # Listeners receive every sample, before any rate limiting
+        self.listeners.setdefault((obj, field), []).append(callback)
+
+    def remove_listener(self, obj, field, callback):
+        if callback in self.listeners.get((obj, field), []):
+            self.listeners[(obj, field)].remove(callback)
+
+    def filter(self, data):
+        now = monotonic()
+        filtered = {}
+        for obj, fields in data.items():
+            if not isinstance(fields, dict):
+                filtered[obj] = fields
+                continue
+            for field, value in fields.items():
+                key = (obj, field)
+                for listener in self.listeners.get(key, ()):
+                    listener(value)
+                interval = self.intervals.get(key)
+                if interval is None or now - self.last_sent.get(key, 0) >= interval:
+                    filtered.setdefault(obj, {})[field] = value
+                    self.last_sent[key] = now
+                    self.pending.pop(key, None)
+                else:
+                    # Only the latest sample is kept
+                    self.pending[key] = value
+        self.schedule_flush(now)
+        return filtered
+
+    def schedule_flush(self, now):
+        if not self.pending or self.flush_timeout is not None:
+            return
+        delay = min(self.intervals[key] - (now - self.last_sent[key]) for key in self.pending)
+        self.flush_timeout = GLib.timeout_add(max(int(delay * 1000), 1), self.flush)
+
+    def flush(self):
+        self.flush_timeout = None
+        now = monotonic()
+        due = {}
+        for key in list(self.pending):
+            if now - self.last_sent[key] >= self.intervals[key] * .95:
+                due.setdefault(key[0], {})[key[1]] = self.pending.pop(key)
+                self.last_sent[key] = now
+        if due:
+            self.callback(due)
+        self.schedule_flush(now)
+        return False
+
+    def clear(self):
+        if self.flush_timeout is not None:
+            GLib.source_remove(self.flush_timeout)
+            self.flush_timeout = None
+        self.pending.clear()
+        self.last_sent.clear()
@@ -4,7 +4,7 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Pango
-from ks_includes.KlippyGtk import find_widget
+from ks_includes.widgetcache import WidgetCache
 
 
 class ScreenPanel:
@@ -33,6 +33,12 @@ class ScreenPanel:
         self.bts = self._gtk.bsidescale
 
         self.update_dialog = None
+        self.cache = WidgetCache()
+
+    def subscriptions(self):
+        # Printer objects and fields this panel needs while it's in the panel stack
+        # e.g. {"gcode_move": ["gcode_position"]}
+        return {}
 
     def _autoscroll(self, scroll, *args):
         adj = scroll.get_vadjustment()
@@ -200,10 +206,10 @@ class ScreenPanel:
 
         if dev in self.labels:
             # Job_Status
-            find_widget(self.labels[dev], Gtk.Label).set_text(new_label_text)
+            self.cache.set_text(self.cache.find(self.labels[dev], Gtk.Label), new_label_text)
         elif dev in self.devices:
             # Temperature and Main_Menu
-            find_widget(self.devices[dev]["temp"], Gtk.Label).set_text(new_label_text)
+            self.cache.set_text(self.cache.find(self.devices[dev]["temp"], Gtk.Label), new_label_text)
 
     def add_option(self, boxname, opt_array, opt_name, option):
         if option['type'] is None:
@@ -1,9 +1,21 @@
 # This is the backend of the UI panel that communicates to sdbus-networkmanager
 # TODO device selection/swtichability
 # Alfredo Monclus (alfrix) 2024
+import asyncio
 import subprocess
 import logging
-
+import threading
+
+from sdbus_async.networkmanager import (
+    NetworkManager as NetworkManagerAsync,
+    NetworkDeviceGeneric as NetworkDeviceGenericAsync,
+    NetworkDeviceWireless as NetworkDeviceWirelessAsync,
+    NetworkConnectionSettings as NetworkConnectionSettingsAsync,
+    NetworkManagerSettings as NetworkManagerSettingsAsync,
+    AccessPoint as AccessPointAsync,
+    IPv4Config as IPv4ConfigAsync,
+    ActiveConnection as ActiveConnectionAsync,
+)
 from sdbus_block.networkmanager import (
     NetworkManager,
     NetworkDeviceGeneric,
@@ -37,6 +49,9 @@ KEY_MGMT_OWE = 2048  # WPA/RSN Opportunistic Wireless Encryption
 KEY_MGMT_OWE_TM = 4096  # WPA/RSN Opportunistic Wireless Encryption transition mode
 KEY_MGMT_EAP_SUITE_B_192 = 8192  # WPA3 Enterprise Suite-B 192
 
+MONITOR_RETRY_MIN = 2  # Seconds before restarting a monitor that ended, doubled on each failure
+MONITOR_RETRY_MAX = 60
+
 
 def get_encryption(flags):
     if flags == 0:
@@ -87,6 +102,21 @@ def WifiChannels(freq: str):
         return "?", "?"
 
 
+def network_info(ap):
+    # ap: the properties of an AccessPoint as returned by properties_get_all_dict
+    ssid = ap["ssid"].decode("utf-8", errors="replace")
+    band, channel = WifiChannels(ap["frequency"])
+    return {
+        "SSID": ssid,
+        "security": get_encryption(ap["rsn_flags"] or ap["wpa_flags"] or ap["flags"]),
+        "frequency": band,
+        "channel": channel,
+        "signal_level": ap["strength"],
+        "max_bitrate": ap["max_bitrate"],
+        "BSSID": ap["hw_address"],
+    }
+
+
 class SdbusNm:
 
     def __init__(self, popup_callback):
@@ -96,15 +126,32 @@ class SdbusNm:
             return None
         set_default_bus(self.system_bus)
         self.nm = NetworkManager()
-        self.wlan_device = (
-            self.get_wireless_interfaces()[0]
-            if self.get_wireless_interfaces()
-            else None
-        )
+        wireless = self.get_wireless_paths()
+        self.wlan_path = wireless[0] if wireless else None
+        self.wlan_device = NetworkDeviceWireless(self.wlan_path) if self.wlan_path else None
         self.wifi = self.wlan_device is not None
+        self.default_interface = (
+            self.wlan_device.interface
+            if self.wlan_device
+            else next((iface for iface in self.get_interfaces() if iface != "lo"), None)
+        )
         self.monitor_connection = False
         self.wifi_state = -1
         self.popup = popup_callback
+        # Filled from NetworkManager signals by the monitor thread, read from the GTK thread
+        self.lock = threading.Lock()
+        self.access_points = {}
+        self.known = set()
+        self.connected_bssid = None
+        self.primary_interface = self.default_interface
+        self.ip_address = "?"
+        self.on_change = None
+        self.change_pending = False
+        self.loop = None
+        self.monitor_task = None
+        self.wlan = None
+        self.retry_delay = MONITOR_RETRY_MIN
+        self.retry_source = None
 
     def ensure_nm_running(self):
         try:
@@ -125,22 +172,19 @@ class SdbusNm:
             NetworkDeviceGeneric(device).interface for device in self.nm.get_devices()
         ]
 
-    def get_wireless_interfaces(self):
-        devices = {path: NetworkDeviceGeneric(path) for path in self.nm.get_devices()}
+    def get_wireless_paths(self):
         return [
-            NetworkDeviceWireless(path)
-            for path, device in devices.items()
-            if device.device_type == enums.DeviceType.WIFI
+            path
+            for path in self.nm.get_devices()
+            if NetworkDeviceGeneric(path).device_type == enums.DeviceType.WIFI
         ]
 
+    def get_wireless_interfaces(self):
+        return [NetworkDeviceWireless(path) for path in self.get_wireless_paths()]
+
     def get_primary_interface(self):
         if self.nm.primary_connection == "/":
-            if self.wlan_device:
-                return self.wlan_device.interface
-            return next(
-                (interface for interface in self.get_interfaces() if interface != "lo"),
-                None,
-            )
+            return self.default_interface
         gateway = ActiveConnection(self.nm.primary_connection).devices[0]
         return NetworkDeviceGeneric(gateway).interface
 
@@ -161,6 +205,9 @@ class SdbusNm:
         return known_networks
 
     def is_known(self, ssid):
+        if self.monitor_task is not None:
+            with self.lock:
+                return ssid in self.known
         return any(net["SSID"] == ssid for net in self.get_known_networks())
 
     def is_open(self, ssid):
@@ -175,27 +222,19 @@ class SdbusNm:
         return ip_info.address_data[0]["address"][1]
 
     def get_networks(self):
-        networks = []
-        if self.wlan_device:
-            all_aps = [AccessPoint(result) for result in self.wlan_device.access_points]
-            networks.extend(
-                {
-                    "SSID": ap.ssid.decode("utf-8"),
-                    "known": self.is_known(ap.ssid.decode("utf-8")),
-                    "security": get_encryption(
-                        ap.rsn_flags or ap.wpa_flags or ap.flags
-                    ),
-                    "frequency": WifiChannels(ap.frequency)[0],
-                    "channel": WifiChannels(ap.frequency)[1],
-                    "signal_level": ap.strength,
-                    "max_bitrate": ap.max_bitrate,
-                    "BSSID": ap.hw_address,
-                }
-                for ap in all_aps
-                if ap.ssid
-            )
-            return sorted(networks, key=lambda i: i["signal_level"], reverse=True)
-        return networks
+        # Served from the cache kept up to date by the monitor, D-Bus is only walked when it isn't running
+        if self.monitor_task is None:
+            if not self.wlan_device:
+                return []
+            known = {net["SSID"] for net in self.get_known_networks()}
+            aps = [AccessPoint(path).properties_get_all_dict() for path in self.wlan_device.access_points]
+            networks = [network_info(ap) for ap in aps if ap["ssid"]]
+        else:
+            with self.lock:
+                known = set(self.known)
+                networks = list(self.access_points.values())
+        networks = [dict(net, known=net["SSID"] in known) for net in networks]
+        return sorted(networks, key=lambda i: i["signal_level"], reverse=True)
 
     def get_bssid_from_ssid(self, ssid):
         return next(net["BSSID"] for net in self.get_networks() if ssid == net["SSID"])
@@ -206,6 +245,8 @@ class SdbusNm:
         return AccessPoint(self.wlan_device.active_access_point)
 
     def get_connected_bssid(self):
+        if self.monitor_task is not None:
+            return self.connected_bssid
         return (
             self.get_connected_ap().hw_address
             if self.get_connected_ap() is not None
@@ -327,7 +368,11 @@ class SdbusNm:
             }
 
     def rescan(self):
-        return self.wlan_device.request_scan({})
+        if self.monitor_task is None or self.wlan is None:
+            # The monitor loop isn't ready yet
+            return self.wlan_device.request_scan({})
+        # The results arrive as AccessPointAdded/Removed and LastScan changes
+        asyncio.run_coroutine_threadsafe(self.scan(), self.loop)
 
     def get_connection_path_by_ssid(self, ssid):
         existing_networks = NetworkManagerSettings().list_connections()
@@ -358,13 +403,11 @@ class SdbusNm:
     def toggle_wifi(self, enable):
         self.nm.wireless_enabled = enable
 
-    def monitor_connection_status(self):
-        state = self.wlan_device.state
-        if self.wifi_state != state:
-            logging.debug(f"State changed: {state} {self.wlan_device.state_reason}")
-            if self.wifi_state == -1:
-                logging.debug("Starting to monitor state")
-            elif state in [
+    def report_state(self, state):
+        if self.wifi_state == -1:
+            logging.debug("Starting to monitor state")
+        elif self.wifi_state != state and self.monitor_connection:
+            if state in [
                 enums.DeviceState.PREPARE,
                 enums.DeviceState.CONFIG,
             ]:
@@ -386,8 +429,212 @@ class SdbusNm:
                 self.popup(_("Network disconnected"))
             elif state == enums.DeviceState.FAILED:
                 self.popup(_("Connection failed"))
-            self.wifi_state = state
-        return self.monitor_connection
+        self.wifi_state = state
+        return False
 
     def enable_monitoring(self, enable):
+        # Only toggles the popups, the cache is kept up to date while the monitor runs
         self.monitor_connection = enable
+
+    def start_monitor(self, on_change):
+        # on_change is called in the GTK thread every time the cached state changes
+        self.on_change = on_change
+        if self.monitor_task is not None or self.retry_source is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.monitor_task = self.loop.create_task(self.monitor())
+        threading.Thread(target=self.run_monitor, args=(self.loop, self.monitor_task), daemon=True).start()
+
+    def stop_monitor(self):
+        self.on_change = None
+        if self.retry_source is not None:
+            GLib.source_remove(self.retry_source)
+            self.retry_source = None
+        if self.monitor_task is None:
+            return
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.monitor_task.cancel)
+        self.monitor_task = None
+
+    def run_monitor(self, loop, task):
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            logging.debug("Stopped monitoring NetworkManager")
+        except Exception as e:
+            logging.exception(f"NetworkManager monitor failed: {e}")
+        else:
+            logging.info("NetworkManager monitor ended")
+        finally:
+            loop.close()
+            GLib.idle_add(self.monitor_stopped, task)
+
+    def monitor_stopped(self, task):
+        if self.monitor_task is not task:
+            # Stopped on purpose or already replaced
+            return False
+        # Until the monitor is back the cache is stale, the blocking calls are used instead
+        self.monitor_task = None
+        try:
+            self.primary_interface = self.get_primary_interface()
+            self.ip_address = self.get_ip_address()
+        except Exception as e:
+            logging.debug(f"Failed to refresh the connection: {e}")
+        logging.info(f"Restarting the NetworkManager monitor in {self.retry_delay}s")
+        self.retry_source = GLib.timeout_add_seconds(self.retry_delay, self.restart_monitor)
+        self.retry_delay = min(self.retry_delay * 2, MONITOR_RETRY_MAX)
+        if self.on_change is not None:
+            self.on_change()
+        return False
+
+    def restart_monitor(self):
+        self.retry_source = None
+        if self.on_change is not None:
+            self.start_monitor(self.on_change)
+        return False
+
+    def changed(self):
+        # Signals come in bursts during a scan, the GTK side is notified once per burst
+        if not self.change_pending:
+            self.change_pending = True
+            GLib.idle_add(self.emit_changed)
+
+    def emit_changed(self):
+        self.change_pending = False
+        if self.on_change is not None:
+            self.on_change()
+        return False
+
+    async def monitor(self):
+        # Runs in its own thread with its own bus, sd-bus connections can't be shared between threads
+        self.bus = sd_bus_open_system()
+        try:
+            self.nm_async = NetworkManagerAsync(self.bus)
+            self.settings = NetworkManagerSettingsAsync(self.bus)
+            watches = [
+                self.watch(self.nm_async.properties_changed, self.on_manager_properties),
+                self.watch(self.settings.new_connection, self.on_settings_changed),
+                self.watch(self.settings.connection_removed, self.on_settings_changed),
+            ]
+            if self.wlan_path:
+                self.wlan = NetworkDeviceWirelessAsync(self.wlan_path, self.bus)
+                watches += [
+                    self.watch(self.wlan.state_changed, self.on_state_changed),
+                    self.watch(self.wlan.properties_changed, self.on_device_properties),
+                    self.watch(self.wlan.access_point_added, self.on_access_point_added),
+                    self.watch(self.wlan.access_point_removed, self.on_access_point_removed),
+                ]
+                GLib.idle_add(self.report_state, await self.wlan.state)
+            await self.refresh_known()
+            await self.refresh_connection()
+            await self.refresh_access_points()
+            self.changed()
+            GLib.idle_add(self.monitor_ready)
+            await asyncio.gather(*watches)
+        finally:
+            self.wlan = None
+            self.bus.close()
+
+    def monitor_ready(self):
+        self.retry_delay = MONITOR_RETRY_MIN
+        return False
+
+    @staticmethod
+    async def watch(signal, handler):
+        async for data in signal:
+            try:
+                await handler(data)
+            except Exception as e:
+                logging.debug(f"Failed to handle NetworkManager signal: {e}")
+
+    async def on_manager_properties(self, data):
+        interface, changed, invalidated = data
+        if {"PrimaryConnection", "WirelessEnabled", "State"} & changed.keys():
+            await self.refresh_connection()
+            self.changed()
+
+    async def on_settings_changed(self, path):
+        await self.refresh_known()
+        self.changed()
+
+    async def on_state_changed(self, data):
+        state, old_state, reason = data
+        logging.debug(f"State changed: {old_state} -> {state} reason: {reason}")
+        GLib.idle_add(self.report_state, state)
+
+    async def on_device_properties(self, data):
+        interface, changed, invalidated = data
+        if "LastScan" in changed:
+            # NetworkManager refreshes the strength of every access point on each scan
+            await self.refresh_access_points()
+            self.changed()
+        if "ActiveAccessPoint" in changed:
+            await self.refresh_connection()
+            self.changed()
+
+    async def on_access_point_added(self, path):
+        if net := await self.read_access_point(path):
+            with self.lock:
+                self.access_points[path] = net
+            self.changed()
+
+    async def on_access_point_removed(self, path):
+        with self.lock:
+            removed = self.access_points.pop(path, None)
+        if removed is not None:
+            self.changed()
+
+    async def read_access_point(self, path):
+        try:
+            ap = await AccessPointAsync(path, self.bus).properties_get_all_dict()
+        except Exception as e:
+            # Access points vanish while they are being read
+            logging.debug(f"Couldn't read access point {path}: {e}")
+            return None
+        return network_info(ap) if ap["ssid"] else None
+
+    async def refresh_access_points(self):
+        access_points = {}
+        for path in await self.wlan.access_points:
+            if net := await self.read_access_point(path):
+                access_points[path] = net
+        with self.lock:
+            self.access_points = access_points
+
+    async def refresh_known(self):
+        known = set()
+        for path in await self.settings.list_connections():
+            con_settings = await NetworkConnectionSettingsAsync(path, self.bus).get_settings()
+            if con_settings["connection"]["type"][1] == "802-11-wireless":
+                known.add(con_settings["802-11-wireless"]["ssid"][1].decode())
+        with self.lock:
+            self.known = known
+
+    async def refresh_connection(self):
+        connected_bssid = None
+        if self.wlan_path:
+            active_ap = await self.wlan.active_access_point
+            if active_ap != "/":
+                connected_bssid = await AccessPointAsync(active_ap, self.bus).hw_address
+        interface, ip_address = self.default_interface, "?"
+        primary = await self.nm_async.primary_connection
+        if primary and primary != "/":
+            active_connection = ActiveConnectionAsync(primary, self.bus)
+            devices = await active_connection.devices
+            if devices:
+                interface = await NetworkDeviceGenericAsync(devices[0], self.bus).interface
+            ip4_config = await active_connection.ip4_config
+            if ip4_config != "/":
+                address_data = await IPv4ConfigAsync(ip4_config, self.bus).address_data
+                if address_data:
+                    ip_address = address_data[0]["address"][1]
+        self.connected_bssid = connected_bssid
+        self.primary_interface = interface
+        self.ip_address = ip_address
+
+    async def scan(self):
+        try:
+            await self.wlan.request_scan({})
+        except Exception as e:
+            logging.debug(f"Scan request failed: {e}")
@@ -0,0 +1,128 @@
+import logging
+from time import monotonic
+
+
+class SpoolmanCatalogue:
+    # Spools fetched from Spoolman through moonraker, cached by id and last_used so the panel
+    # only asks for what changed, it's kept in the Printer and outlives the panel
+    page_size = 50
+    # Responses can be lost on disconnects, a refresh that takes longer is abandoned
+    timeout = 30
+    # Deltas only see spools that were used, new, edited and deleted spools need a full refresh
+    full_interval = 300
+
+    def __init__(self):
+        self.spools = {}
+        self.materials = {}
+        self.names = {}
+        self.allow_archived = None
+        self.loading = None
+        self.generation = 0
+        self.full_time = 0
+
+    @property
+    def loaded(self):
+        return self.allow_archived is not None
+
+    def store(self, spool):
+        spool_id = spool["id"]
+        old = self.spools.get(spool_id)
+        if old == spool:
+            return False
+        if old is not None:
+            self.unindex(old)
+        self.spools[spool_id] = spool
+        filament = spool.get("filament", {})
+        self.materials.setdefault(filament.get("material", ""), set()).add(spool_id)
+        vendor = (filament.get("vendor") or {}).get("name", "")
+        self.names[spool_id] = f"{vendor} {filament.get('name', '')}".lower()
+        return True
+
+    def drop(self, spool_id):
+        if spool_id in self.spools:
+            self.unindex(self.spools.pop(spool_id))
+            self.names.pop(spool_id, None)
+
+    def unindex(self, spool):
+        material = spool.get("filament", {}).get("material", "")
+        ids = self.materials.get(material)
+        if ids is not None:
+            ids.discard(spool["id"])
+            if not ids:
+                del self.materials[material]
+
+    def filter(self, material=None, name=""):
+        # Returns the ids to show, None means every spool
+        if material is None and not name:
+            return None
+        ids = set(self.materials.get(material, ())) if material is not None else set(self.spools)
+        if name:
+            name = name.lower()
+            ids = {spool_id for spool_id in ids if name in self.names[spool_id]}
+        return ids
+
+    def refresh(self, api, allow_archived, callback, full=False):
+        # callback(changed, removed) is called once with the sets of spool ids, or (None, None) on errors
+        if self.loading is not None and monotonic() - self.loading < self.timeout:
+            return
+        if allow_archived != self.allow_archived or monotonic() - self.full_time > self.full_interval:
+            full = True
+        self.loading = monotonic()
+        self.generation += 1
+        self.fetch_page(api, allow_archived, callback, full, 0, set(), set())
+
+    def fetch_page(self, api, allow_archived, callback, full, offset, changed, seen):
+        # Deltas walk the spools by last_used and stop at the first one that is already cached
+        sort = "id:asc" if full else "last_used:desc"
+        path = (
+            f"/v1/spool?allow_archived={allow_archived}&sort={sort}"
+            f"&limit={self.page_size}&offset={offset}"
+        )
+        if not api.spoolman_proxy("GET", path, self.page_loaded, self.generation, api, allow_archived, callback,
+                                  full, offset, changed, seen):
+            self.loading = None
+            callback(None, None)
+
+    def page_loaded(self, result, method, params, generation, api, allow_archived, callback, full, offset, changed,
+                    seen):
+        if generation != self.generation:
+            # A refresh that timed out
+            return
+        if "result" not in result or not isinstance(result["result"], list):
+            logging.error(f"Error fetching spools: {result.get('error')}")
+            self.loading = None
+            callback(None, None)
+            return
+        page = result["result"]
+        done = len(page) < self.page_size
+        for spool in page:
+            seen.add(spool["id"])
+            cached = self.spools.get(spool["id"])
+            if not full and cached is not None and cached.get("last_used") == spool.get("last_used"):
+                done = True
+                break
+            if self.store(spool):
+                changed.add(spool["id"])
+        if not done:
+            self.loading = monotonic()
+            self.fetch_page(api, allow_archived, callback, full, offset + self.page_size, changed, seen)
+            return
+        removed = set()
+        if full:
+            removed = set(self.spools) - seen
+            for spool_id in removed:
+                self.drop(spool_id)
+            self.allow_archived = allow_archived
+            self.full_time = monotonic()
+        logging.debug(f"Spools: {len(self.spools)} cached, {len(changed)} changed, {len(removed)} removed")
+        self.loading = None
+        callback(changed, removed)
+
+    def refresh_spool(self, api, spool_id, callback):
+        if spool_id is None or not self.loaded:
+            return
+        api.spoolman_proxy("GET", f"/v1/spool/{spool_id}", self.spool_loaded, callback)
+
+    def spool_loaded(self, result, method, params, callback):
+        if "result" in result and isinstance(result["result"], dict) and self.store(result["result"]):
+            callback({result["result"]["id"]}, set())
@@ -0,0 +1,47 @@
+from collections import deque
+from math import ceil
+
+
+class StreamStats:
+    # Count, minimum, maximum, mean and a quantile of the samples of a window, plus an exponential
+    # moving average that carries over between windows. Only the last size samples are kept, the
+    # quantile is exact over them and is always a value that was sampled
+    def __init__(self, quantile=0.5, smoothing=0.2, size=64):
+        self.p = quantile
+        self.smoothing = smoothing
+        self.samples = deque(maxlen=size)
+        self.average = None
+        self.count = 0
+        self.total = 0.0
+        self.minimum = self.maximum = None
+
+    def reset(self):
+        # Starts a new window
+        self.samples.clear()
+        self.count = 0
+        self.total = 0.0
+        self.minimum = self.maximum = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.samples.append(value)
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        if self.average is None:
+            self.average = value
+        else:
+            self.average += self.smoothing * (value - self.average)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    @property
+    def quantile(self):
+        if not self.samples:
+            return 0
+        # Nearest rank
+        return sorted(self.samples)[max(ceil(self.p * len(self.samples)) - 1, 0)]
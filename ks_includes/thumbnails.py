@@ -0,0 +1,83 @@
+import base64
+import binascii
+import hashlib
+import logging
+import mmap
+import os
+import re
+import threading
+from queue import SimpleQueue as Queue
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+# Slicers write their thumbnails before the first move, QOI is skipped as GdkPixbuf can't load it
+THUMBNAIL = re.compile(
+    rb"^; (thumbnail(?:_PNG|_JPG)?) begin (\d+)x(\d+) \d+\r?\n(.*?)^; \1 end",
+    re.DOTALL | re.MULTILINE,
+)
+NOT_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
+HEADER_LIMIT = 2 * 1024 * 1024
+
+
+def extract_thumbnails(filename):
+    # Returns {(width, height): data} of the png and jpg thumbnails embedded in the header of the gcode
+    thumbnails = {}
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for match in THUMBNAIL.finditer(mm, 0, min(len(mm), HEADER_LIMIT)):
+            width, height, encoded = match.group(2, 3, 4)
+            try:
+                data = base64.b64decode(NOT_BASE64.sub(b"", encoded))
+            except (binascii.Error, ValueError):
+                continue
+            thumbnails[(int(width), int(height))] = data
+    return thumbnails
+
+
+class ThumbnailExtractor:
+    # Writes the thumbnails embedded in local gcodes to cache_dir so they don't have to be downloaded
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.jobs = Queue()
+        self.worker = None
+
+    def cached_path(self, filename, width, height):
+        name = hashlib.sha1(filename.encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}-{width}x{height}.png")
+
+    def find(self, filename, width, height):
+        # Returns the cached thumbnail if it's newer than the gcode
+        path = self.cached_path(filename, width, height)
+        try:
+            if os.path.getmtime(path) >= os.path.getmtime(filename):
+                return path
+        except OSError:
+            pass
+        return None
+
+    def extract(self, filename, callback):
+        # callback(filename, {(width, height): path}) is called in the GTK thread
+        self.jobs.put((filename, callback))
+        if self.worker is None:
+            self.worker = threading.Thread(target=self.run_jobs, daemon=True)
+            self.worker.start()
+
+    def run_jobs(self):
+        while True:
+            filename, callback = self.jobs.get()
+            paths = {}
+            try:
+                thumbnails = extract_thumbnails(filename)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                for (width, height), data in thumbnails.items():
+                    # GdkPixbuf detects the format from the data, jpgs are fine with a png extension
+                    path = self.cached_path(filename, width, height)
+                    with open(f"{path}.tmp", "wb") as f:
+                        f.write(data)
+                    os.replace(f"{path}.tmp", path)
+                    paths[(width, height)] = path
+            except (OSError, ValueError) as e:
+                logging.debug(f"Unable to extract thumbnails of {filename}: {e}")
+            GLib.idle_add(callback, filename, paths)
@@ -0,0 +1,90 @@
+import logging
+from itertools import count
+from time import monotonic
+
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import GLib
+
+
+class TimerTask:
+    def __init__(self, interval, callback, args, group):
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.group = group
+        self.calls = 0
+        self.runtime = 0.0
+        self.max_runtime = 0.0
+
+    @property
+    def name(self):
+        return getattr(self.callback, "__qualname__", repr(self.callback))
+
+
+class TimerWheel:
+    # Periodic tasks share a single 1 second tick, a task with an interval of n seconds runs on every
+    # tick that is a multiple of n, so tasks with related intervals wake the process together
+    report_interval = 600
+
+    def __init__(self):
+        self.tasks = {}
+        self.paused = set()
+        self.ticks = 0
+        self.tick_source = None
+        self.ids = count(1)
+
+    def add(self, interval, callback, *args, group=None):
+        # Same contract as GLib.timeout_add_seconds, the task is removed when the callback returns False
+        task_id = next(self.ids)
+        self.tasks[task_id] = TimerTask(max(int(interval), 1), callback, args, group)
+        if self.tick_source is None:
+            self.tick_source = GLib.timeout_add_seconds(1, self.tick)
+        return task_id
+
+    def remove(self, task_id):
+        self.tasks.pop(task_id, None)
+
+    def pause(self, group):
+        logging.debug(f"Pausing timers: {group}")
+        self.paused.add(group)
+
+    def resume(self, group):
+        logging.debug(f"Resuming timers: {group}")
+        self.paused.discard(group)
+
+    def tick(self):
+        self.ticks += 1
+        for task_id, task in list(self.tasks.items()):
+            if self.ticks % task.interval or task.group in self.paused or task_id not in self.tasks:
+                continue
+            start = monotonic()
+            try:
+                keep = task.callback(*task.args)
+            except Exception as e:
+                logging.exception(f"Timer {task.name} failed: {e}")
+                keep = False
+            elapsed = monotonic() - start
+            task.calls += 1
+            task.runtime += elapsed
+            task.max_runtime = max(task.max_runtime, elapsed)
+            if not keep:
+                self.tasks.pop(task_id, None)
+        if self.ticks % self.report_interval == 0:
+            self.log_report()
+        if not self.tasks:
+            self.tick_source = None
+            return False
+        return True
+
+    def report(self):
+        return [
+            f"{task.name} every {task.interval}s{f' ({task.group})' if task.group else ''}: "
+            f"{task.calls} calls, {task.runtime / task.calls * 1000 if task.calls else 0:.1f} ms avg, "
+            f"{task.max_runtime * 1000:.1f} ms max"
+            for task in self.tasks.values()
+        ]
+
+    def log_report(self):
+        logging.debug("Timers:\n" + "\n".join(self.report()))
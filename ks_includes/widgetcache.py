@@ -0,0 +1,46 @@
+from weakref import WeakKeyDictionary
+
+from ks_includes.KlippyGtk import find_widget
+
+
+class WidgetCache:
+    # Remembers what was last written to each widget so unchanged values don't trigger a relayout,
+    # all writes to a widget must go through the cache or the remembered value becomes stale
+    def __init__(self):
+        self.values = WeakKeyDictionary()
+        self.children = WeakKeyDictionary()
+
+    def _update(self, widget, prop, setter, value):
+        values = self.values.setdefault(widget, {})
+        if prop in values and values[prop] == value:
+            return False
+        values[prop] = value
+        setter(value)
+        return True
+
+    def set_label(self, widget, text):
+        return self._update(widget, "label", widget.set_label, text)
+
+    def set_text(self, widget, text):
+        # Gtk.Label set_text and set_label write the same property
+        return self._update(widget, "label", widget.set_text, text)
+
+    def set_markup(self, widget, markup):
+        return self._update(widget, "markup", widget.set_markup, markup)
+
+    def set_fraction(self, widget, fraction):
+        return self._update(widget, "fraction", widget.set_fraction, fraction)
+
+    def find(self, widget, wanted_type):
+        children = self.children.setdefault(widget, {})
+        if wanted_type not in children:
+            children[wanted_type] = find_widget(widget, wanted_type)
+        return children[wanted_type]
+
+    def forget(self, widget):
+        self.values.pop(widget, None)
+        self.children.pop(widget, None)
+
+    def clear(self):
+        self.values.clear()
+        self.children.clear()
@@ -1,8 +1,59 @@
 import logging
+import threading
+from array import array
+from math import floor, pi
+
+import cairo
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import Gdk, GLib, Gtk
+
+# Pixels per mesh point of the interpolated heatmap, cairo scales it to the widget
+HEATMAP_SCALE = 16
+HEATMAP_MAX = 256
+
+
+def cubic_taps(points, size):
+    # Catmull-Rom taps to resample points values into size, as (indices, weights) per output sample
+    taps = []
+    for k in range(size):
+        u = min(max((k + .5) * points / size - .5, 0), points - 1)
+        i = floor(u)
+        t = u - i
+        weights = (
+            (-t ** 3 + 2 * t ** 2 - t) / 2,
+            (3 * t ** 3 - 5 * t ** 2 + 2) / 2,
+            (-3 * t ** 3 + 4 * t ** 2 + t) / 2,
+            (t ** 3 - t ** 2) / 2,
+        )
+        taps.append((tuple(min(max(i + d, 0), points - 1) for d in (-1, 0, 1, 2)), weights))
+    return taps
+
+
+def interpolate(matrix, rows, columns):
+    # Bicubic resampling done as two passes of 4 taps, rows first, then whole rows are blended at once
+    horizontal = [
+        [row[a] * wa + row[b] * wb + row[c] * wc + row[d] * wd for (a, b, c, d), (wa, wb, wc, wd) in
+         cubic_taps(len(matrix[0]), columns)]
+        for row in matrix
+    ]
+    return [
+        [a * wa + b * wb + c * wc + d * wd for a, b, c, d in
+         zip(horizontal[i0], horizontal[i1], horizontal[i2], horizontal[i3])]
+        for (i0, i1, i2, i3), (wa, wb, wc, wd) in cubic_taps(len(matrix), rows)
+    ]
+
+
+def render_heatmap(matrix):
+    rows = min(len(matrix) * HEATMAP_SCALE, HEATMAP_MAX)
+    columns = min(len(matrix[0]) * HEATMAP_SCALE, HEATMAP_MAX)
+    pixels = array("I")
+    for row in interpolate(matrix, rows, columns):
+        for value in row:
+            r, g, b = BedMap.colorbar(value)
+            pixels.append(round(r * 255) << 16 | round(g * 255) << 8 | round(b * 255))
+    return cairo.ImageSurface.create_for_data(pixels, cairo.FORMAT_RGB24, columns, rows, columns * 4)
 
 
 class BedMap(Gtk.DrawingArea):
@@ -11,6 +62,14 @@ class BedMap(Gtk.DrawingArea):
         self.set_hexpand(True)
         self.set_vexpand(True)
         self.connect('draw', self.draw_graph)
+        self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
+        self.connect('button_press_event', self.toggle_smooth)
+        # The map is rendered once per mesh and size, the smooth view is interpolated in a worker thread
+        self.surface = self.surface_key = None
+        self.mesh_key = None
+        self.smooth = False
+        self.heatmap = None
+        self.generation = 0
         self.font_size = font_size
         self.font_spacing = round(self.font_size * 1.5)
         self.bm = list(reversed(bm)) if bm is not None else None
@@ -24,11 +83,9 @@ class BedMap(Gtk.DrawingArea):
     def update_bm(self, bm, radius=None):
         if not bm:
             self.bm = None
+            self.mesh_changed()
             return
 
-        for key, value in bm.items():
-            if key == 'profiles':
-                continue
         if radius:
             self.mesh_radius = float(radius)
         if 'mesh_min' in bm:
@@ -45,6 +102,7 @@ class BedMap(Gtk.DrawingArea):
             bm = self.transform_points_to_matrix(bm['points'])
         else:
             self.bm = None
+            self.mesh_changed()
             return
 
         if self.invert_x and self.invert_y:
@@ -67,6 +125,45 @@ class BedMap(Gtk.DrawingArea):
 
         if self.rotation in (90, 180, 270):
             self.bm = self.rotate_matrix(self.bm)
+        self.mesh_changed()
+
+    def mesh_changed(self):
+        key = (self.bm, tuple(self.mesh_min), tuple(self.mesh_max), self.rotation, self.mesh_radius)
+        if key == self.mesh_key:
+            return
+        self.mesh_key = key
+        self.surface = self.heatmap = None
+        self.generation += 1
+        if self.smooth and self.bm:
+            self.start_interpolation()
+
+    def start_interpolation(self):
+        generation = self.generation
+        matrix = self.bm
+
+        def run():
+            try:
+                heatmap = render_heatmap(matrix)
+            except (IndexError, ValueError, MemoryError) as e:
+                logging.error(f"Unable to interpolate the mesh: {e}")
+                return
+            GLib.idle_add(self.heatmap_ready, generation, heatmap)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def heatmap_ready(self, generation, heatmap):
+        if generation != self.generation:
+            return
+        self.heatmap = heatmap
+        self.surface = None
+        self.queue_draw()
+
+    def toggle_smooth(self, widget, event):
+        self.smooth = not self.smooth
+        if self.smooth and self.heatmap is None and self.bm:
+            self.start_interpolation()
+        self.surface = None
+        self.queue_draw()
 
     @staticmethod
     def transform_points_to_matrix(points):
@@ -97,6 +194,14 @@ class BedMap(Gtk.DrawingArea):
     def draw_graph(self, da, ctx):
         width = da.get_allocated_width()
         height = da.get_allocated_height()
+        if self.surface is None or self.surface_key != (width, height):
+            self.surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+            self.surface_key = (width, height)
+            self.render(cairo.Context(self.surface), width, height)
+        ctx.set_source_surface(self.surface, 0, 0)
+        ctx.paint()
+
+    def render(self, ctx, width, height):
         gwidth = int(width - self.font_size * 2.2)
         gheight = int(height - self.font_size * 1.8)
         # Styling
@@ -135,6 +240,10 @@ class BedMap(Gtk.DrawingArea):
         ctx.show_text(f"{self.mesh_max[0]:.0f}".rjust(4, " "))
         ctx.stroke()
 
+        if self.smooth and self.heatmap is not None:
+            self.draw_heatmap(ctx, gwidth, gheight)
+            return
+
         rows = len(self.bm)
         columns = len(self.bm[0])
         for i, row in enumerate(self.bm):
@@ -166,6 +275,23 @@ class BedMap(Gtk.DrawingArea):
                 ctx.show_text(f"{column:.2f}")
                 ctx.stroke()
 
+    def draw_heatmap(self, ctx, gwidth, gheight):
+        left = self.font_size * 2.2
+        ctx.save()
+        if self.mesh_radius > 0:
+            ctx.translate(left + gwidth / 2, gheight / 2)
+            ctx.scale(gwidth / 2, gheight / 2)
+            ctx.arc(0, 0, 1, 0, 2 * pi)
+            ctx.restore()
+            ctx.save()
+            ctx.clip()
+        ctx.translate(left, 0)
+        ctx.scale(gwidth / self.heatmap.get_width(), gheight / self.heatmap.get_height())
+        ctx.set_source_surface(self.heatmap, 0, 0)
+        ctx.get_source().set_filter(cairo.FILTER_GOOD)
+        ctx.paint()
+        ctx.restore()
+
     @staticmethod
     def round_bed_skip(i, j, row, rows, columns):
         if columns <= 3:
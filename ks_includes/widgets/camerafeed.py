@@ -0,0 +1,48 @@
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gdk, Gtk
+from ks_includes.mjpeg import MjpegReader
+
+
+class CameraFeed(Gtk.DrawingArea):
+    def __init__(self, name, font_size, **reader_args):
+        super().__init__(hexpand=True, vexpand=True)
+        self.name = name
+        self.font_size = font_size
+        self.pixbuf = None
+        self.reader = MjpegReader(self.show_frame, **reader_args)
+        self.add_events(Gdk.EventMask.BUTTON_PRESS_MASK)
+        self.connect('draw', self.draw_feed)
+        self.connect('size-allocate', self.resized)
+
+    def start(self):
+        self.reader.start()
+
+    def stop(self):
+        self.reader.stop()
+
+    def resized(self, widget, allocation):
+        # Frames are scaled in the worker thread, so they are already the right size when drawn
+        self.reader.set_size(allocation.width, allocation.height)
+
+    def show_frame(self, pixbuf):
+        self.pixbuf = pixbuf
+        self.queue_draw()
+
+    def draw_feed(self, da, ctx):
+        width = da.get_allocated_width()
+        height = da.get_allocated_height()
+        if self.pixbuf is not None:
+            x = (width - self.pixbuf.get_width()) / 2
+            y = (height - self.pixbuf.get_height()) / 2
+            Gdk.cairo_set_source_pixbuf(ctx, self.pixbuf, x, y)
+            ctx.paint()
+        ctx.set_font_size(self.font_size)
+        ctx.move_to(self.font_size / 2, height - self.font_size / 2)
+        ctx.text_path(self.name)
+        ctx.set_source_rgb(0, 0, 0)
+        ctx.set_line_width(3)
+        ctx.stroke_preserve()
+        ctx.set_source_rgb(1, 1, 1)
+        ctx.fill()
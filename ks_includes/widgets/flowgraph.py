@@ -0,0 +1,50 @@
+import gi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk
+
+
+class FlowGraph(Gtk.DrawingArea):
+    # Plots a history of (minimum, median, maximum) samples, the band shows the spread of each interval
+    def __init__(self, font_size, history, unit):
+        super().__init__(hexpand=True, vexpand=True)
+        self.font_size = round(font_size * .75)
+        self.history = history
+        self.unit = unit
+        self.set_size_request(-1, font_size * 4)
+        self.connect('draw', self.draw_graph)
+
+    def draw_graph(self, da, ctx):
+        width = da.get_allocated_width()
+        height = da.get_allocated_height()
+        top = self.font_size * 1.5
+        ctx.set_source_rgba(0.5, 0.5, 0.5, 0.5)
+        ctx.set_line_width(1)
+        ctx.move_to(0, height - .5)
+        ctx.line_to(width, height - .5)
+        ctx.stroke()
+        if len(self.history) < 2:
+            return
+        peak = max(max(high for low, mid, high in self.history), 1)
+        step = width / (self.history.maxlen - 1)
+        start = width - step * (len(self.history) - 1)
+
+        def y(value):
+            return height - max(value, 0) / peak * (height - top)
+
+        for i, (low, mid, high) in enumerate(self.history):
+            ctx.line_to(start + i * step, y(high))
+        for i, (low, mid, high) in reversed(list(enumerate(self.history))):
+            ctx.line_to(start + i * step, y(low))
+        ctx.close_path()
+        ctx.set_source_rgba(0.95, 0.6, 0.1, 0.25)
+        ctx.fill()
+        for i, (low, mid, high) in enumerate(self.history):
+            ctx.line_to(start + i * step, y(mid))
+        ctx.set_source_rgb(0.95, 0.6, 0.1)
+        ctx.set_line_width(2)
+        ctx.stroke()
+        ctx.set_source_rgb(0.8, 0.8, 0.8)
+        ctx.set_font_size(self.font_size)
+        ctx.move_to(0, self.font_size)
+        ctx.show_text(f"{peak:.1f} {self.unit}")
@@ -5,7 +5,7 @@ import math
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gdk, Gtk, GLib
+from gi.repository import Gdk, Gtk
 from cairo import Context as cairoContext
 
 
@@ -27,7 +27,7 @@ class HeaterGraph(Gtk.DrawingArea):
         self.font_size = round(font_size * 0.75)
         self.fullscreen = fullscreen
         if fullscreen:
-            GLib.timeout_add_seconds(1, self.update_graph)
+            screen.timers.add(1, self.update_graph, group="display")
         self.fs_graph = None
 
     def update_graph(self):
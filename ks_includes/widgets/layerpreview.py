@@ -0,0 +1,100 @@
+import gi
+from math import pi
+
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk
+
+
+class LayerPreview(Gtk.Box):
+    def __init__(self, font_size):
+        super().__init__(orientation=Gtk.Orientation.VERTICAL, hexpand=True, vexpand=True)
+        self.font_size = font_size
+        self.store = None
+        self.shown = 0
+        # Layer being printed and live toolhead position, the view follows them until the slider is moved
+        self.current = None
+        self.position = None
+        self.follow = True
+        self.area = Gtk.DrawingArea(hexpand=True, vexpand=True)
+        self.area.connect('draw', self.draw_layer)
+        self.scale = Gtk.Scale.new_with_range(Gtk.Orientation.HORIZONTAL, 1, 2, 1)
+        self.scale.set_digits(0)
+        self.scale.set_sensitive(False)
+        self.scale.connect('value-changed', self.scrolled)
+        self.add(self.area)
+        self.add(self.scale)
+
+    def set_store(self, store):
+        self.store = store
+        if store is None or not store.layers:
+            self.scale.set_sensitive(False)
+            self.area.queue_draw()
+            return
+        self.scale.set_range(1, max(store.layers, 2))
+        self.scale.set_sensitive(True)
+        self.show_layer(self.current if self.current is not None else 0)
+
+    def show_layer(self, layer):
+        self.shown = layer
+        if self.scale.get_value() != layer + 1:
+            self.scale.set_value(layer + 1)
+        self.area.queue_draw()
+
+    def scrolled(self, scale):
+        layer = int(scale.get_value()) - 1
+        if layer == self.shown:
+            return
+        self.follow = layer == self.current
+        self.shown = layer
+        self.area.queue_draw()
+
+    def set_current(self, layer, position=None):
+        changed = layer != self.current or position != self.position
+        self.current = layer
+        self.position = position
+        if self.follow and layer != self.shown and self.store is not None:
+            self.show_layer(layer)
+        elif changed and self.shown == layer:
+            self.area.queue_draw()
+
+    def draw_layer(self, da, ctx):
+        width = da.get_allocated_width()
+        height = da.get_allocated_height()
+        if self.store is None or len(self.store.bounds) < 4:
+            return
+        min_x, min_y, max_x, max_y = self.store.bounds
+        margin = self.font_size / 2
+        scale = min((width - 2 * margin) / max(max_x - min_x, 1), (height - 2 * margin) / max(max_y - min_y, 1))
+        ctx.save()
+        ctx.translate((width - (max_x - min_x) * scale) / 2, (height + (max_y - min_y) * scale) / 2)
+        ctx.scale(scale, -scale)
+        ctx.translate(-min_x, -min_y)
+        ctx.set_line_width(max(1.5 / scale, 0.2))
+        if self.shown > 0:
+            self.trace(ctx, self.store.layer(self.shown - 1))
+            ctx.set_source_rgba(0.5, 0.5, 0.5, 0.3)
+            ctx.stroke()
+        self.trace(ctx, self.store.layer(self.shown))
+        ctx.set_source_rgb(0.95, 0.6, 0.1)
+        ctx.stroke()
+        if self.position is not None and self.shown == self.current:
+            ctx.arc(self.position[0], self.position[1], 4 / scale, 0, 2 * pi)
+            ctx.set_source_rgb(1, 1, 1)
+            ctx.fill()
+        ctx.restore()
+        ctx.set_source_rgb(0.8, 0.8, 0.8)
+        ctx.set_font_size(self.font_size)
+        ctx.move_to(margin, self.font_size + margin)
+        ctx.show_text(f"{self.shown + 1} / {self.store.layers}  Z {self.store.layer_z[self.shown]:.2f}"
+                      if self.shown < self.store.layers else "")
+
+    @staticmethod
+    def trace(ctx, segments):
+        # Connected segments are drawn as a single path to keep the number of cairo calls low
+        last = None
+        for i in range(0, len(segments), 4):
+            x0, y0, x1, y1 = segments[i:i + 4]
+            if (x0, y0) != last:
+                ctx.move_to(x0, y0)
+            ctx.line_to(x1, y1)
+            last = (x1, y1)
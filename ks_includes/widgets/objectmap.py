@@ -5,6 +5,20 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gdk, Gtk
 
+# Cells per axis of the grid used to find the objects under a tap
+GRID_CELLS = 16
+
+
+def point_in_polygon(x, y, polygon):
+    # Even-odd ray casting
+    inside = False
+    x0, y0 = polygon[-1]
+    for x1, y1 in polygon:
+        if (y1 > y) != (y0 > y) and x < (x0 - x1) * (y - y1) / (y0 - y1) + x1:
+            inside = not inside
+        x0, y0 = x1, y1
+    return inside
+
 
 class ObjectMap(Gtk.DrawingArea):
     def __init__(self, screen, printer, font_size):
@@ -25,11 +39,60 @@ class ObjectMap(Gtk.DrawingArea):
         self.margin_right = 15
         self.margin_top = 10
         self.margin_bottom = self.font_size * 2
-        self.objects = self.printer.get_stat("exclude_object", "objects")
-        self.current_object = self.printer.get_stat("current_object", "current_object")
-        self.excluded_objects = self.printer.get_stat("exclude_object", "excluded_objects")
-        self.min_x = self.min_y = 99999999
-        self.max_x = self.max_y = 0
+        self.objects = None
+        # Per object (name, polygon, bounding box), a grid of the objects overlapping each cell
+        # and the paths in widget coordinates, rebuilt when the objects or the size change
+        self.shapes = []
+        self.grid = {}
+        self.paths = self.paths_size = None
+        self.min_x = self.min_y = 0
+        self.max_x = self.max_y = 1
+        self.update_objects()
+
+    def update_objects(self):
+        objects = self.printer.get_stat("exclude_object", "objects")
+        if objects is self.objects:
+            return
+        self.objects = objects
+        self.shapes = []
+        for obj in objects or []:
+            polygon = [(float(x), float(y)) for x, y in obj.get("polygon", [])]
+            if len(polygon) < 3:
+                continue
+            xs = [x for x, y in polygon]
+            ys = [y for x, y in polygon]
+            self.shapes.append((obj["name"], polygon, (min(xs), min(ys), max(xs), max(ys))))
+        if self.shapes:
+            self.min_x = min(box[0] for name, polygon, box in self.shapes)
+            self.min_y = min(box[1] for name, polygon, box in self.shapes)
+            self.max_x = max(box[2] for name, polygon, box in self.shapes)
+            self.max_y = max(box[3] for name, polygon, box in self.shapes)
+        if self.max_x <= self.min_x:
+            self.max_x = self.min_x + 1
+        if self.max_y <= self.min_y:
+            self.max_y = self.min_y + 1
+        self.grid = {}
+        for i, (name, polygon, (min_x, min_y, max_x, max_y)) in enumerate(self.shapes):
+            left, bottom = self.grid_cell(min_x, min_y)
+            right, top = self.grid_cell(max_x, max_y)
+            for cx in range(left, right + 1):
+                for cy in range(bottom, top + 1):
+                    self.grid.setdefault((cx, cy), []).append(i)
+        self.paths = None
+
+    def grid_cell(self, x, y):
+        cx = int((x - self.min_x) / (self.max_x - self.min_x) * GRID_CELLS)
+        cy = int((y - self.min_y) / (self.max_y - self.min_y) * GRID_CELLS)
+        return min(max(cx, 0), GRID_CELLS - 1), min(max(cy, 0), GRID_CELLS - 1)
+
+    def object_at(self, x, y):
+        if not (self.min_x <= x <= self.max_x and self.min_y <= y <= self.max_y):
+            return None
+        for i in self.grid.get(self.grid_cell(x, y), ()):
+            name, polygon, (min_x, min_y, max_x, max_y) = self.shapes[i]
+            if min_x <= x <= max_x and min_y <= y <= max_y and point_in_polygon(x, y, polygon):
+                return name
+        return None
 
     def x_graph_to_bed(self, width, gx):
         return (((gx - self.margin_left) * (self.max_x - self.min_x))
@@ -45,19 +108,11 @@ class ObjectMap(Gtk.DrawingArea):
         y = self.y_graph_to_bed(da.get_allocated_height(), ev.y)
         logging.info(f"Touched GRAPH {ev.x:.0f},{ev.y:.0f} BED: {x:.0f},{y:.0f}")
 
-        for obj in self.objects:
-            obj_min_x = obj_max_x = obj["polygon"][0][0]
-            obj_min_y = obj_max_y = obj["polygon"][0][1]
-            for point in obj["polygon"]:
-                obj_min_x = min(obj_min_x, point[0])
-                obj_min_y = min(obj_min_y, point[1])
-                obj_max_x = max(obj_max_x, point[0])
-                obj_max_y = max(obj_max_y, point[1])
-            if obj_min_x < x < obj_max_x and obj_min_y < y < obj_max_y:
-                logging.info(f"TOUCHED object it's: {obj['name']}")
-                if obj['name'] not in self.excluded_objects:
-                    self.exclude_object(obj['name'])
-                break
+        name = self.object_at(x, y)
+        if name is not None:
+            logging.info(f"TOUCHED object it's: {name}")
+            if name not in self.printer.get_stat("exclude_object", "excluded_objects"):
+                self.exclude_object(name)
 
     def exclude_object(self, name):
         script = {"script": f"EXCLUDE_OBJECT NAME={name}"}
@@ -69,18 +124,11 @@ class ObjectMap(Gtk.DrawingArea):
         )
 
     def draw_graph(self, da, ctx):
-        right = da.get_allocated_width() - self.margin_right
-        bottom = da.get_allocated_height() - self.margin_bottom
-        self.objects = self.printer.get_stat("exclude_object", "objects")
-
-        for obj in self.objects:
-            for point in obj["polygon"]:
-                # Find min coords
-                self.min_x = min(self.min_x, point[0])
-                self.min_y = min(self.min_y, point[1])
-                # Find max coords
-                self.max_x = max(self.max_x, point[0])
-                self.max_y = max(self.max_y, point[1])
+        width = da.get_allocated_width()
+        height = da.get_allocated_height()
+        right = width - self.margin_right
+        bottom = height - self.margin_bottom
+        self.update_objects()
 
         # Styling
         ctx.set_source_rgb(.5, .5, .5)  # Grey
@@ -120,26 +168,31 @@ class ObjectMap(Gtk.DrawingArea):
         ctx.set_dash([1, 0])
 
         # Draw objects
-        for obj in self.objects:
-            # change the color depending on the status
-            if obj['name'] == self.printer.get_stat("exclude_object", "current_object"):
-                ctx.set_source_rgb(1, 0, 0)  # Red
-            elif obj['name'] in self.printer.get_stat("exclude_object", "excluded_objects"):
-                ctx.set_source_rgb(0, 0, 0)  # Black
-            else:
-                ctx.set_source_rgb(.5, .5, .5)  # Grey
-            for i, point in enumerate(obj["polygon"]):
-                # Convert coordinates from bed to screen-graph
-                x = self.x_bed_to_graph(da.get_allocated_width(), point[0])
-                y = self.y_bed_to_graph(da.get_allocated_height(), point[1])
-                if i == 0:
-                    ctx.move_to(x, y)
-                    continue
-                ctx.line_to(x, y)
-                # logging.info(f"obj graph: {x=:.0f},{y=:.0f} bed: {point[0]:.0f},{point[1]:.0f}")
-            ctx.close_path()
+        if self.paths is None or self.paths_size != (width, height):
+            self.paths = {}
+            self.paths_size = (width, height)
+            for name, polygon, box in self.shapes:
+                ctx.new_path()
+                for x, y in polygon:
+                    # Convert coordinates from bed to screen-graph
+                    ctx.line_to(self.x_bed_to_graph(width, x), self.y_bed_to_graph(height, y))
+                ctx.close_path()
+                self.paths[name] = ctx.copy_path()
+            ctx.new_path()
+        # Objects are filled in one go per color depending on the status
+        current = self.printer.get_stat("exclude_object", "current_object")
+        excluded = set(self.printer.get_stat("exclude_object", "excluded_objects") or ())
+        for color, names in (
+            ((.5, .5, .5), [name for name in self.paths if name not in excluded and name != current]),  # Grey
+            ((0, 0, 0), [name for name in self.paths if name in excluded and name != current]),  # Black
+            ((1, 0, 0), [current] if current in self.paths else []),  # Red
+        ):
+            if not names:
+                continue
+            for name in names:
+                ctx.append_path(self.paths[name])
+            ctx.set_source_rgb(*color)
             ctx.fill()
-            ctx.stroke()
 
     def x_bed_to_graph(self, width, bx):
         return (((bx - self.min_x) * (width - self.margin_left - self.margin_right))
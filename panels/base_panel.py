@@ -4,8 +4,7 @@ import logging
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import GLib, Gtk, Pango
-from jinja2 import Environment
+from gi.repository import Gtk, Pango
 from datetime import datetime
 from math import log
 from ks_includes.screen_panel import ScreenPanel
@@ -21,6 +20,8 @@ class BasePanel(ScreenPanel):
         self.titlebar_items = []
         self.titlebar_name_type = None
         self.current_extruder = None
+        # Devices whose temperature is observed, only the ones shown in the titlebar
+        self.observed_heaters = set()
         self.last_usage_report = datetime.now()
         self.usage_report = 0
         # Action bar buttons
@@ -124,6 +125,7 @@ class BasePanel(ScreenPanel):
                 self.control['temp_box'].remove(child)
             devices = self._printer.get_temp_devices()
             if not show or not devices:
+                self.observe_heaters(set())
                 return
 
             img_size = self._gtk.img_scale * self.bts
@@ -164,10 +166,19 @@ class BasePanel(ScreenPanel):
                         n += 1
                         break
 
+            self.observe_heaters({device for device in devices if self.labels[f"{device}_box"].get_parent()})
             self.control['temp_box'].show_all()
         except Exception as e:
             logging.debug(f"Couldn't create heaters box: {e}")
 
+    def observe_heaters(self, devices):
+        for device in self.observed_heaters - devices:
+            self._printer.remove_observer(device, "temperature", self.update_temp_label)
+        for device in devices:
+            self._printer.add_observer(device, "temperature", self.update_temp_label)
+            self.update_temp_label(device, "temperature", self._printer.get_stat(device, "temperature"))
+        self.observed_heaters = devices
+
     def get_icon(self, device, img_size):
         if device.startswith("extruder"):
             if self._printer.extrudercount > 1:
@@ -188,9 +199,12 @@ class BasePanel(ScreenPanel):
         else:
             return self._gtk.Image("heat-up", img_size, img_size)
 
+    def subscriptions(self):
+        return {"toolhead": ["extruder"]}
+
     def activate(self):
         if self.time_update is None:
-            self.time_update = GLib.timeout_add_seconds(1, self.update_time)
+            self.time_update = self._screen.timers.add(1, self.update_time, group="display")
 
     def add_content(self, panel):
         printing = self._printer and self._printer.state in {"printing", "paused"}
@@ -229,14 +243,14 @@ class BasePanel(ScreenPanel):
                 if not ctx.has_class(error):
                     ctx.add_class(error)
                 self._screen.log_notification(f"{self._screen.connecting_to_printer}: {msg}", 2)
-                self.titlelbl.set_label(msg)
+                self.cache.set_label(self.titlelbl, msg)
             elif ctx.has_class(error):
                 if (datetime.now() - self.last_usage_report).seconds < 5:
-                    self.titlelbl.set_label(msg)
+                    self.cache.set_label(self.titlelbl, msg)
                     return
                 self.usage_report = 0
                 ctx.remove_class(error)
-                self.titlelbl.set_label(f"{self._screen.connecting_to_printer}")
+                self.cache.set_label(self.titlelbl, f"{self._screen.connecting_to_printer}")
             return
 
         if action == "notify_update_response":
@@ -261,22 +275,11 @@ class BasePanel(ScreenPanel):
 
         if action != "notify_status_update" or self._screen.printer is None:
             return
-        for device in self._printer.get_temp_devices():
-            temp = self._printer.get_stat(device, "temperature")
-            if temp and device in self.labels:
-                name = ""
-                if not (device.startswith("extruder") or device.startswith("heater_bed")):
-                    if self.titlebar_name_type == "full":
-                        name = device.split()[1] if len(device.split()) > 1 else device
-                        name = f'{self.prettify(name)}: '
-                    elif self.titlebar_name_type == "short":
-                        name = device.split()[1] if len(device.split()) > 1 else device
-                        name = f"{name[:1].upper()}: "
-                self.labels[device].set_label(f"{name}{temp:.0f}°")
 
         if (self.current_extruder and 'toolhead' in data and 'extruder' in data['toolhead']
                 and data["toolhead"]["extruder"] != self.current_extruder):
             self.control['temp_box'].remove(self.labels[f"{self.current_extruder}_box"])
+            self.observe_heaters(self.observed_heaters - {self.current_extruder} | {data["toolhead"]["extruder"]})
             self.current_extruder = data["toolhead"]["extruder"]
             self.control['temp_box'].pack_start(self.labels[f"{self.current_extruder}_box"], True, True, 3)
             self.control['temp_box'].reorder_child(self.labels[f"{self.current_extruder}_box"], 0)
@@ -284,6 +287,19 @@ class BasePanel(ScreenPanel):
 
         return False
 
+    def update_temp_label(self, device, field, temp):
+        if not temp or device not in self.labels:
+            return
+        name = ""
+        if not (device.startswith("extruder") or device.startswith("heater_bed")):
+            if self.titlebar_name_type == "full":
+                name = device.split()[1] if len(device.split()) > 1 else device
+                name = f'{self.prettify(name)}: '
+            elif self.titlebar_name_type == "short":
+                name = device.split()[1] if len(device.split()) > 1 else device
+                name = f"{name[:1].upper()}: "
+        self.cache.set_label(self.labels[device], f"{name}{temp:.0f}°")
+
     def remove(self, widget):
         self.content.remove(widget)
 
@@ -309,17 +325,15 @@ class BasePanel(ScreenPanel):
     def set_title(self, title):
         self.titlebar.get_style_context().remove_class("message_popup_error")
         if not title:
-            self.titlelbl.set_label(f"{self._screen.connecting_to_printer}")
+            self.cache.set_label(self.titlelbl, f"{self._screen.connecting_to_printer}")
             return
         try:
-            env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
-            env.install_gettext_translations(self._config.get_lang())
-            j2_temp = env.from_string(title)
-            title = j2_temp.render()
+            if "{" in title:
+                title = self._screen.get_template(title).render()
         except Exception as e:
             logging.debug(f"Error parsing jinja for title: {title}\n{e}")
 
-        self.titlelbl.set_label(f"{self._screen.connecting_to_printer} | {title}")
+        self.cache.set_label(self.titlelbl, f"{self._screen.connecting_to_printer} | {title}")
 
     def update_time(self):
         now = datetime.now()
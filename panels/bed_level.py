@@ -51,7 +51,7 @@ class Panel(ScreenPanel):
         grid = Gtk.Grid(row_homogeneous=True, column_homogeneous=True)
         grid.attach(self.buttons['dm'], 0, 0, 1, 1)
 
-        if "screws_tilt_adjust" in self._printer.get_config_section_list():
+        if self._printer.config_section_exists("screws_tilt_adjust"):
             self.buttons['screws'] = self._gtk.Button("refresh", _("Screws Adjust"), "color4")
             self.buttons['screws'].connect("clicked", self.screws_tilt_calculate)
             grid.attach(self.buttons['screws'], 0, 1, 1, 1)
@@ -76,7 +76,7 @@ class Panel(ScreenPanel):
 
             self.screws = new_screws
             logging.info(f"screws with offset: {self.screws}")
-        elif "bed_screws" in self._printer.get_config_section_list():
+        elif self._printer.config_section_exists("bed_screws"):
             self.screws = self._get_screws("bed_screws")
             logging.info(f"bed_screws: {self.screws}")
 
@@ -262,6 +262,9 @@ class Panel(ScreenPanel):
                 continue
             self.buttons[button].set_sensitive((not busy))
 
+    def subscriptions(self):
+        return {"toolhead": ["homed_axes"]}
+
     def process_update(self, action, data):
         if 'idle_timeout' in data:
             self.process_busy(data['idle_timeout']['state'].lower() == "printing")
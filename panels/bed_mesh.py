@@ -54,6 +54,12 @@ class Panel(ScreenPanel):
         self.labels['main_grid'] = grid
         self.content.add(self.labels['main_grid'])
 
+    def subscriptions(self):
+        return {
+            "bed_mesh": ["profile_name", "mesh_max", "mesh_min", "probed_matrix", "profiles"],
+            "toolhead": ["homed_axes"],
+        }
+
     def activate(self):
         self.load_meshes()
         with contextlib.suppress(KeyError):
@@ -163,8 +169,13 @@ class Panel(ScreenPanel):
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
+        if 'bed_mesh' in data and 'profiles' in data['bed_mesh']:
+            self.load_meshes()
         if 'bed_mesh' in data and 'profile_name' in data['bed_mesh']:
             self.activate_mesh(data['bed_mesh']['profile_name'])
+        elif 'bed_mesh' in data and 'probed_matrix' in data['bed_mesh'] and self.active_mesh is not None:
+            # The map only re-renders if the mesh actually changed
+            self.update_graph(profile=self.active_mesh)
 
     def remove_create(self):
         if self.show_create is False:
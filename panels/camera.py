@@ -1,18 +1,40 @@
-import mpv
 import logging
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 from contextlib import suppress
 from ks_includes.screen_panel import ScreenPanel
+from ks_includes.widgets.autogrid import AutoGrid
+from ks_includes.widgets.camerafeed import CameraFeed
+
+try:
+    gi.require_version("GdkX11", "3.0")
+    from gi.repository import GdkX11  # noqa: F401 Provides get_xid to embed the player
+except (ValueError, ImportError):
+    GdkX11 = None
+
+# mpv_end_file_reason values that mean the stream is over, stop and quit come from us
+END_FILE_EOF = 0
+END_FILE_ERROR = 4
 
 
 class Panel(ScreenPanel):
     def __init__(self, screen, title):
         title = title or _("Camera")
         super().__init__(screen, title)
+        # A single player is kept warm and reused for every stream, it's only terminated on release
+        if getattr(self, "mpv", None) is not None:
+            # A reinit runs __init__ again on the same panel
+            self.release()
         self.mpv = None
+        self.embedded = False
+        self.playing = False
+        self.feeds = []
+        self.snapshot_mode = self._config.get_main_config().get("camera_mode", "mpv") == "snapshot"
+        if self.snapshot_mode:
+            self.build_grid()
+            return
         box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         for i, cam in enumerate(self._printer.cameras):
             if not cam["enabled"]:
@@ -30,27 +52,94 @@ class Panel(ScreenPanel):
         self.scroll = self._gtk.ScrolledWindow()
         self.scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         self.scroll.add(box)
-        self.content.add(self.scroll)
+
+        # The stream is drawn inside the panel so the titlebar, the action bar and the e-stop stay usable
+        self.video = Gtk.DrawingArea(hexpand=True, vexpand=True)
+        close = self._gtk.Button("cancel", None, "color1", self.bts)
+        close.set_halign(Gtk.Align.END)
+        close.set_valign(Gtk.Align.START)
+        close.connect("clicked", self.stop)
+        overlay = Gtk.Overlay()
+        overlay.add(self.video)
+        overlay.add_overlay(close)
+
+        self.stack = Gtk.Stack()
+        self.stack.add_named(self.scroll, "list")
+        self.stack.add_named(overlay, "video")
+        self.content.add(self.stack)
         self.content.show_all()
 
+    def build_grid(self):
+        # Every camera is shown at once from jpeg frames, without a video pipeline
+        fps = self._config.get_main_config().getfloat("camera_fps", 5)
+        for cam in self._printer.cameras:
+            if not cam["enabled"]:
+                continue
+            feed = CameraFeed(
+                cam["name"], self._gtk.font_size,
+                snapshot_url=self.full_url(cam.get("snapshot_url")),
+                stream_url=self.full_url(cam.get("stream_url")),
+                fps=min(fps, cam.get("target_fps") or fps),
+                flip_h=cam["flip_horizontal"], flip_v=cam["flip_vertical"], rotation=cam["rotation"],
+            )
+            feed.connect("button-press-event", self.toggle_feed)
+            self.feeds.append(feed)
+        self.grid = AutoGrid(self.feeds)
+        self.grid.set_row_spacing(2)
+        self.grid.set_column_spacing(2)
+        self.content.add(self.grid)
+        self.content.show_all()
+
+    def toggle_feed(self, feed, event):
+        # Tapping a camera shows it alone, tapping it again goes back to the grid
+        others = [other for other in self.feeds if other is not feed]
+        expand = any(other.get_visible() for other in others)
+        for other in others:
+            other.set_visible(not expand)
+            if expand:
+                other.stop()
+            else:
+                other.start()
+
+    def full_url(self, url):
+        if not url:
+            return None
+        if url.startswith('/'):
+            endpoint = self._screen.apiclient.endpoint.split(':')
+            url = f"{endpoint[0]}:{endpoint[1]}{url}"
+        return url
+
     def activate(self):
-        # if only 1 cam start playing fullscreen
+        if self.snapshot_mode:
+            for feed in self.feeds:
+                feed.start()
+            return
+        # if only 1 cam start playing
         if len(self._printer.cameras) == 1:
             cam = next(iter(self._printer.cameras))
             if cam['enabled']:
                 self.play(None, cam)
 
     def deactivate(self):
+        for feed in self.feeds:
+            # The window is shown again on every panel change, so the grid is restored
+            feed.stop()
+            feed.show()
+        self.stop()
+
+    def release(self):
         if self.mpv:
             self.mpv.terminate()
             self.mpv = None
 
+    def back(self):
+        if self.playing and len(self._printer.cameras) > 1:
+            self.stop()
+            return True
+        return False
+
     def play(self, widget, cam):
-        url = cam['stream_url']
-        if url.startswith('/'):
-            logging.info("camera URL is relative")
-            endpoint = self._screen.apiclient.endpoint.split(':')
-            url = f"{endpoint[0]}:{endpoint[1]}{url}"
+        url = self.full_url(cam['stream_url'])
         if '/webrtc' in url:
             self._screen.show_popup_message(_('WebRTC is not supported by the backend trying Stream'))
             url = url.replace('/webrtc', '/stream')
@@ -62,40 +151,100 @@ class Panel(ScreenPanel):
         vf += f"rotate:{cam['rotation'] * 3.14159 / 180}"
         logging.info(f"video filters: {vf}")
 
-        if self.mpv:
-            self.mpv.terminate()
-        self.mpv = mpv.MPV(fullscreen=True, log_handler=self.log, vo='gpu,wlshm,xv,x11')
+        self.playing = True
+        self.stack.set_visible_child_name("video")
+        # The drawing area needs a window before the player can be embedded into it
+        GLib.idle_add(self.start_playback, url, vf)
 
+    def start_playback(self, url, vf):
+        if not self.playing:
+            return False
+        if self.mpv is None:
+            try:
+                self.mpv = self.create_player()
+            except Exception as e:
+                logging.exception(e)
+                self._screen.show_popup_message(_("Error") + f"\n{e}")
+                self.stop()
+                return False
+        if self.embedded:
+            # The drawing area gets a new window whenever the panel is shown again
+            xid = self.video_xid()
+            if xid is None:
+                self.stop()
+                return False
+            self.mpv.wid = xid
         self.mpv.vf = vf
+        logging.debug(f"Camera URL: {url}")
+        self.mpv.play(url)
+        return False
+
+    def create_player(self):
+        import mpv  # Deferred, libmpv is slow to load
+        xid = self.video_xid()
+        options = {}
+        if xid is not None:
+            options["wid"] = xid
+            self.embedded = True
+        else:
+            # Wayland can't embed a foreign window, fall back to a fullscreen window of its own
+            options["fullscreen"] = True
+            self.embedded = False
+        player = mpv.MPV(log_handler=self.log, vo='gpu,wlshm,xv,x11', idle=True, **options)
 
         with suppress(Exception):
-            self.mpv.profile = 'sw-fast'
+            player.profile = 'sw-fast'
 
         # LOW LATENCY PLAYBACK
         with suppress(Exception):
-            self.mpv.profile = 'low-latency'
-        self.mpv.untimed = True
-        self.mpv.audio = 'no'
+            player.profile = 'low-latency'
+        player.untimed = True
+        player.audio = 'no'
 
-        @self.mpv.on_key_press('MBTN_LEFT' or 'MBTN_LEFT_DBL')
+        # mpv calls these from its own event thread
+        @player.on_key_press('MBTN_LEFT')
         def clicked():
-            self.mpv.quit(0)
+            GLib.idle_add(self.stop)
 
-        logging.debug(f"Camera URL: {url}")
-        self.mpv.play(url)
+        @player.event_callback('end-file')
+        def ended(event):
+            # python-mpv 1.0 passes an event object, older versions a dict
+            if hasattr(event, "data"):
+                reason = getattr(event.data, "reason", None)
+            else:
+                reason = event.get("event", {}).get("reason")
+            if reason in (END_FILE_EOF, END_FILE_ERROR):
+                GLib.idle_add(self.playback_ended)
 
-        try:
-            self.mpv.wait_for_playback()
-        except mpv.ShutdownError:
-            logging.info('Exiting Fullscreen')
-        except Exception as e:
-            logging.exception(e)
-        self.mpv.terminate()
-        self.mpv = None
+        logging.info(f"Camera player created ({'embedded' if self.embedded else 'fullscreen'})")
+        return player
+
+    def video_xid(self):
+        window = self.video.get_window()
+        if GdkX11 is not None and window is not None and hasattr(window, "get_xid"):
+            return str(window.get_xid())
+        return None
+
+    def stop(self, widget=None):
+        if self.snapshot_mode:
+            return False
+        if self.mpv and self.playing:
+            # Stopping keeps the player and its video output initialized for the next stream
+            self.mpv.command('stop')
+        self.playing = False
+        self.stack.set_visible_child_name("list")
+        return False
+
+    def playback_ended(self):
+        if not self.playing:
+            return False
+        logging.info('Playback ended')
+        self.stop()
         if len(self._printer.cameras) == 1:
             self._screen._menu_go_back()
+        return False
 
     def log(self, loglevel, component, message):
         logging.debug(f'[{loglevel}] {component}: {message}')
         if loglevel == 'error' and 'No Xvideo support found' not in message and 'youtube-dl' not in message:
-            self._screen.show_popup_message(f'{message}')
+            GLib.idle_add(self._screen.show_popup_message, f'{message}')
@@ -3,7 +3,8 @@ import re
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
+from collections import deque
 from datetime import datetime
 from ks_includes.screen_panel import ScreenPanel
 
@@ -15,6 +16,33 @@ COLORS = {
     "time": "grey",
     "warning": "#c9c9c9"
 }
+COLORS["temperature"] = COLORS["response"]
+TEMPERATURE = re.compile(r'^(?:ok\s+)?(B|C|T\d*):')
+# Entries kept in memory, entries kept in the text buffer, and entries loaded when scrolling past the top
+HISTORY = 1000
+VIEW = 200
+PAGE = 100
+
+
+def classify(msgtype, message):
+    if msgtype == "command":
+        return "command", message
+    if message.startswith("!!"):
+        return "error", message.replace("!! ", "")
+    if message.startswith("//"):
+        return "warning", message.replace("// ", "")
+    if TEMPERATURE.match(message):
+        return "temperature", message
+    return "response", message
+
+
+def format_entry(entry):
+    seq, msgtime, kind, message = entry
+    message = GLib.markup_escape_text(message).replace('\n', '\n         ')
+    return (
+        f'\n<span color="{COLORS["time"]}">{datetime.fromtimestamp(msgtime).strftime("%H:%M:%S")}</span> '
+        f'<span color="{COLORS[kind]}"><b>{message}</b></span>'
+    )
 
 
 class Panel(ScreenPanel):
@@ -23,6 +51,19 @@ class Panel(ScreenPanel):
         super().__init__(screen, title)
         self.autoscroll = True
         self.hidetemps = True
+        # Parsed entries, newest last, each one is (seq, time, kind, message)
+        self.entries = deque(maxlen=HISTORY)
+        self.seq = 0
+        # Newest time seen in the gcode store, in the clock of the Moonraker host, and the (type, message) of
+        # the entries received live since then, which the store will hand back again
+        self.store_time = 0
+        self.live = deque(maxlen=HISTORY)
+        # Follows the bottom of the view, scrolling back stops the autoscroll and the trimming of the buffer
+        self.at_bottom = True
+        # Entries waiting for the next frame, and (seq, lines) of the entries in the text buffer
+        self.pending = []
+        self.rendered = deque()
+        self.flush_source = None
 
         o1_button = self._gtk.Button("arrow-down", _("Auto-scroll") + " ", None, self.bts, Gtk.PositionType.RIGHT, 1)
         o1_button.get_style_context().add_class("button_active")
@@ -44,6 +85,8 @@ class Panel(ScreenPanel):
         options.attach(o3_button, 2, 0, 1, 1)
 
         sw = Gtk.ScrolledWindow(hexpand=True, vexpand=True)
+        sw.connect("edge-reached", self._load_older)
+        sw.get_vadjustment().connect("value-changed", self._scrolled)
 
         tb = Gtk.TextBuffer()
         tv = Gtk.TextView(buffer=tb, editable=False, cursor_visible=False)
@@ -83,53 +126,105 @@ class Panel(ScreenPanel):
         self.content.add(content_box)
 
     def clear(self, widget=None):
+        self.entries.clear()
+        self.pending.clear()
+        self.rendered.clear()
         self.labels['tb'].set_text("")
 
     def add_gcode(self, msgtype, msgtime, message):
-        if msgtype == "command":
-            color = COLORS['command']
-        elif message.startswith("!!"):
-            color = COLORS['error']
-            message = message.replace("!! ", "")
-        elif message.startswith("//"):
-            color = COLORS['warning']
-            message = message.replace("// ", "")
-        elif self.hidetemps and re.match('^(?:ok\\s+)?(B|C|T\\d*):', message):
+        kind, message = classify(msgtype, message)
+        self.seq += 1
+        entry = (self.seq, msgtime, kind, message)
+        self.entries.append(entry)
+        self.pending.append(entry)
+        if self.flush_source is None:
+            # Everything that arrives within a frame is inserted at once
+            self.flush_source = self.labels['tv'].add_tick_callback(self.flush)
+
+    def shown(self, entry):
+        return not (self.hidetemps and entry[2] == "temperature")
+
+    def flush(self, widget=None, frame_clock=None):
+        self.flush_source = None
+        visible = [entry for entry in self.pending if self.shown(entry)]
+        self.pending.clear()
+        if len(visible) >= VIEW:
+            self.render()
+            return False
+        if visible:
+            tb = self.labels['tb']
+            tb.insert_markup(tb.get_end_iter(), "".join(format_entry(entry) for entry in visible), -1)
+            self.rendered.extend((entry[0], entry[3].count('\n') + 1) for entry in visible)
+        # While scrolled back the buffer may grow up to the whole history
+        self.trim(len(self.rendered) - (VIEW if self.autoscroll and self.at_bottom else HISTORY))
+        return False
+
+    def trim(self, count):
+        # Drops the oldest entries of the text buffer, older ones stay in the history
+        if count <= 0:
             return
-        else:
-            color = COLORS['response']
-
-        message = f'<span color="{color}"><b>{message}</b></span>'
-
-        message = message.replace('\n', '\n         ')
-
-        self.labels['tb'].insert_markup(
-            self.labels['tb'].get_end_iter(),
-            f'\n<span color="{COLORS["time"]}">{datetime.fromtimestamp(msgtime).strftime("%H:%M:%S")}</span> {message}',
-            -1
-        )
-        # Limit the length
-        if self.labels['tb'].get_line_count() > 999:
-            self.labels['tb'].delete(self.labels['tb'].get_iter_at_line(0), self.labels['tb'].get_iter_at_line(1))
+        lines = sum(self.rendered.popleft()[1] for i in range(count))
+        tb = self.labels['tb']
+        end = tb.get_iter_at_line(lines)
+        end.forward_to_line_end()
+        tb.delete(tb.get_start_iter(), end)
+
+    def render(self):
+        # Only the newest entries that can be scrolled to are kept in the text buffer
+        visible = [entry for entry in self.entries if self.shown(entry)][-VIEW:]
+        self.rendered = deque((entry[0], entry[3].count('\n') + 1) for entry in visible)
+        tb = self.labels['tb']
+        tb.set_text("")
+        tb.insert_markup(tb.get_end_iter(), "".join(format_entry(entry) for entry in visible), -1)
+
+    def _load_older(self, sw, pos):
+        if pos != Gtk.PositionType.TOP or not self.rendered or not self.entries:
+            return
+        first = self.rendered[0][0]
+        older = [entry for entry in self.entries if entry[0] < first and self.shown(entry)][-PAGE:]
+        if not older:
+            return
+        tb = self.labels['tb']
+        mark = tb.create_mark(None, tb.get_start_iter(), False)
+        tb.insert_markup(tb.get_start_iter(), "".join(format_entry(entry) for entry in older), -1)
+        self.rendered.extendleft(reversed([(entry[0], entry[3].count('\n') + 1) for entry in older]))
+        # Keep the line that was at the top in place instead of jumping to the oldest entry
+        self.labels['tv'].scroll_to_mark(mark, 0, True, 0, 0)
+        tb.delete_mark(mark)
 
     def gcode_response(self, result, method, params):
-        if method != "server.gcode_store":
+        if method != "server.gcode_store" or "result" not in result:
             return
-
+        # The store always returns its tail, only what wasn't seen yet is added, comparing only host times
+        store_time = self.store_time
         for resp in result['result']['gcode_store']:
+            if resp['time'] <= store_time:
+                continue
+            self.store_time = max(self.store_time, resp['time'])
+            received = (resp['type'], resp['message'])
+            if received in self.live:
+                # Already shown when it was received, older live entries missing from the store are dropped
+                while self.live.popleft() != received:
+                    pass
+                continue
             self.add_gcode(resp['type'], resp['time'], resp['message'])
 
     def process_update(self, action, data):
         if action == "notify_gcode_response":
+            self.live.append(("response", data))
             self.add_gcode("response", time.time(), data)
 
     def hide_temps(self, widget):
         self.hidetemps ^= True
         self.toggle_active_class(widget, self.hidetemps)
+        self.render()
 
     def set_autoscroll(self, widget):
         self.autoscroll ^= True
         self.toggle_active_class(widget, self.autoscroll)
+        if self.autoscroll:
+            self.at_bottom = True
+            self._autoscroll()
 
     @staticmethod
     def toggle_active_class(widget, cond):
@@ -138,8 +233,11 @@ class Panel(ScreenPanel):
         else:
             widget.get_style_context().remove_class("button_active")
 
+    def _scrolled(self, adj):
+        self.at_bottom = adj.get_value() >= adj.get_upper() - adj.get_page_size() - 1
+
     def _autoscroll(self, *args):
-        if self.autoscroll:
+        if self.autoscroll and self.at_bottom:
             adj = self.labels['sw'].get_vadjustment()
             adj.set_value(adj.get_upper() - adj.get_page_size())
 
@@ -148,9 +246,9 @@ class Panel(ScreenPanel):
         self.labels['entry'].set_text('')
         self._screen.remove_keyboard()
 
+        self.live.append(("command", cmd))
         self.add_gcode("command", time.time(), cmd)
         self._screen._ws.klippy.gcode_script(cmd)
 
     def activate(self):
-        self.clear()
         self._screen._ws.send_method("server.gcode_store", {"count": 100}, self.gcode_response)
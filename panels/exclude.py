@@ -17,13 +17,16 @@ class Panel(ScreenPanel):
         self.current_object = self._gtk.Button("extrude", "", scale=self.bts, position=Gtk.PositionType.LEFT, lines=1)
         self.current_object.connect("clicked", self.exclude_current)
         self.current_object.set_vexpand(False)
-        self.excluded_objects = self._printer.get_stat("exclude_object", "excluded_objects")
+        # Buttons are keyed by object name and only the objects that changed are added or removed
+        self.excluded_objects = set(self._printer.get_stat("exclude_object", "excluded_objects") or ())
         logging.info(f'Excluded: {self.excluded_objects}')
-        self.objects = self._printer.get_stat("exclude_object", "objects")
+        self.objects = self._printer.get_stat("exclude_object", "objects") or []
+        self.object_names = {obj["name"] for obj in self.objects}
+        self.current_name = None
         self.labels['map'] = None
         for obj in self.objects:
-            logging.info(f"Adding {obj['name']}")
             self.add_object(obj["name"])
+        self.update_current(self._printer.get_stat("exclude_object", "current_object") or None)
 
         scroll = self._gtk.ScrolledWindow()
         scroll.add(self.object_list)
@@ -53,10 +56,64 @@ class Panel(ScreenPanel):
             self.buttons[name].get_children()[0].set_line_wrap(True)
             self.buttons[name].connect("clicked", self.exclude_object, name)
             self.buttons[name].get_style_context().add_class("frame-item")
+            if name == self.current_name:
+                self.buttons[name].get_style_context().add_class("button_active")
             self.object_list.add(self.buttons[name])
+            self.buttons[name].show_all()
+
+    def remove_object(self, name):
+        if name in self.buttons:
+            self.object_list.remove(self.buttons.pop(name))
+
+    def update_objects(self, objects):
+        self.objects = objects or []
+        names = {obj["name"] for obj in self.objects}
+        logging.info(f'Objects: {len(names)}, {len(names - self.object_names)} new, '
+                     f'{len(self.object_names - names)} removed')
+        for name in self.object_names - names:
+            self.remove_object(name)
+        added = names - self.object_names
+        self.object_names = names
+        if not added:
+            return
+        for obj in self.objects:
+            self.add_object(obj["name"])
+        self.sort_buttons()
+
+    def sort_buttons(self):
+        # New buttons are appended, move them to their place in the object order
+        position = 0
+        for obj in self.objects:
+            if obj["name"] in self.buttons:
+                self.object_list.reorder_child(self.buttons[obj["name"]], position)
+                position += 1
+
+    def update_excluded(self, excluded):
+        excluded = set(excluded or ())
+        logging.info(f'Excluded objects: {excluded}')
+        added, restored = excluded - self.excluded_objects, self.excluded_objects - excluded
+        self.excluded_objects = excluded
+        for name in added:
+            self.remove_object(name)
+        restored &= self.object_names
+        for name in restored:
+            self.add_object(name)
+        if restored:
+            self.sort_buttons()
+
+    def update_current(self, name):
+        if name == self.current_name:
+            return
+        if self.current_name in self.buttons:
+            self.buttons[self.current_name].get_style_context().remove_class("button_active")
+        self.current_name = name
+        if name in self.buttons:
+            self.buttons[name].get_style_context().add_class("button_active")
+        if name:
+            self.current_object.set_label(f'{name.replace("_", " ")}')
 
     def exclude_object(self, widget, name):
-        if len(self.excluded_objects) == len(self.objects) - 1:
+        if len(self.object_names - self.excluded_objects) == 1:
             # Do not exclude the last object, this is a workaround for a bug of klipper that starts
             # to move the toolhead really fast skipping gcode until the file ends
             # Remove this if they fix it.
@@ -75,35 +132,25 @@ class Panel(ScreenPanel):
         )
 
     def exclude_current(self, widget):
-        self.exclude_object(widget, f"{self.current_object.get_label()}")
+        if self.current_name:
+            self.exclude_object(widget, self.current_name)
+
+    def subscriptions(self):
+        return {"exclude_object": ["current_object", "objects", "excluded_objects"]}
 
     def process_update(self, action, data):
         if action == "notify_status_update":
             if "exclude_object" in data:
-                if "object" in data["exclude_object"]:                    # Update objects
-                    self.objects = data["exclude_object"]["objects"]
-                    logging.info(f'Objects: {data["exclude_object"]["objects"]}')
-                    for obj in self.buttons:
-                        self.object_list.remove(self.buttons[obj])
-                    self.buttons = {}
-                    for obj in self.objects:
-                        logging.info(f"Adding {obj['name']}")
-                        self.add_object(obj["name"])
-                    self.content.show_all()
-                if "current_object" in data["exclude_object"]:                    # Update objects
-                    # Update current objects
-                    if data["exclude_object"]["current_object"]:
-                        self.current_object.set_label(f'{data["exclude_object"]["current_object"].replace("_", " ")}')
+                if "objects" in data["exclude_object"]:
+                    self.update_objects(data["exclude_object"]["objects"])
+                    self.update_graph()
+                if "current_object" in data["exclude_object"]:
+                    self.update_current(data["exclude_object"]["current_object"] or None)
                     self.update_graph()
-                if "excluded_objects" in data["exclude_object"]:                    # Update objects
-                    # Update excluded objects
-                    logging.info(f'Excluded objects: {data["exclude_object"]["excluded_objects"]}')
-                    self.excluded_objects = data["exclude_object"]["excluded_objects"]
-                    for name in self.excluded_objects:
-                        if name in self.buttons:
-                            self.object_list.remove(self.buttons[name])
+                if "excluded_objects" in data["exclude_object"]:
+                    self.update_excluded(data["exclude_object"]["excluded_objects"])
                     self.update_graph()
-                    if len(self.excluded_objects) == len(self.objects):
+                    if self.object_names and self.object_names <= self.excluded_objects:
                         self._screen._menu_go_back()
         elif action == "notify_gcode_response" and "Excluding object" in data:
             self._screen.show_popup_message(data, level=1)
@@ -192,6 +192,12 @@ class Panel(ScreenPanel):
                 continue
             self.buttons[button].set_sensitive(enable)
 
+    def subscriptions(self):
+        requested = {"toolhead": ["extruder"]}
+        for sensor in self._printer.get_filament_sensors():
+            requested[sensor] = ["enabled", "filament_detected"]
+        return requested
+
     def activate(self):
         self.enable_buttons(self._printer.state in ("ready", "paused"))
 
@@ -298,4 +304,4 @@ class Panel(ScreenPanel):
             new_label_text += f"/{target:.0f}°"
         if self._show_heater_power and power:
             new_label_text += f" {power * 100:3.0f}%"
-        find_widget(self.labels[extruder], Gtk.Label).set_text(new_label_text)
+        self.cache.set_text(self.cache.find(self.labels[extruder], Gtk.Label), new_label_text)
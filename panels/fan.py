@@ -25,6 +25,9 @@ class Panel(ScreenPanel):
 
         self.content.add(scroll)
 
+    def subscriptions(self):
+        return {fan: ["speed"] for fan in self.devices}
+
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
@@ -112,6 +112,9 @@ class Panel(ScreenPanel):
 
         self.content.add(grid)
 
+    def subscriptions(self):
+        return {"gcode_move": ["extrude_factor", "homing_origin", "speed_factor"]}
+
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
@@ -7,7 +7,10 @@ from gi.repository import Gtk, Pango
 from datetime import datetime
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.KlippyGtk import find_widget
+from ks_includes.gcodeindex import load_file
+from ks_includes.gcodepreview import GCODE_DATA, LayerStore
 from ks_includes.widgets.flowboxchild_extended import PrintListItem
+from ks_includes.widgets.layerpreview import LayerPreview
 
 
 def format_label(widget):
@@ -38,6 +41,7 @@ class Panel(ScreenPanel):
         self.time_24 = self._config.get_main_config().getboolean("24htime", True)
         self.showing_rename = False
         self.loading = False
+        self.preview = self.preview_path = None
         self.cur_directory = 'gcodes'
         self.list_button_size = self._gtk.img_scale * self.bts
 
@@ -321,10 +325,23 @@ class Panel(ScreenPanel):
         box.pack_start(label, False, False, 0)
 
         height = (self._screen.height - self._gtk.dialog_buttons_height - self._gtk.font_size * 5) * .75
-        pixbuf = self.get_file_image(filename, self._screen.width * .9, height)
+        previews = Gtk.Box(homogeneous=True, spacing=5)
+        gcode = os.path.join(self._files.gcodes_path, filename) if self._files.gcodes_path else None
+        self.preview = self.preview_path = None
+        if gcode is not None and os.access(gcode, os.R_OK):
+            # Parsed in a worker thread, the layers are shown next to the thumbnail once ready
+            self.preview = LayerPreview(self._gtk.font_size)
+            self.preview.set_size_request(-1, height)
+            self.preview_path = gcode
+            load_file(gcode, GCODE_DATA, self.preview_ready)
+        width = self._screen.width * (.45 if self.preview is not None else .9)
+        pixbuf = self.get_file_image(filename, width, height)
         if pixbuf is not None:
             image = Gtk.Image.new_from_pixbuf(pixbuf)
-            box.pack_start(image, True, True, 0)
+            previews.add(image)
+        if self.preview is not None:
+            previews.add(self.preview)
+        box.pack_start(previews, True, True, 0)
 
         fileinfo = self._screen.files.get_file_info(filename)
         if "estimated_time" in fileinfo:
@@ -335,7 +352,12 @@ class Panel(ScreenPanel):
 
         self._gtk.Dialog(f'{action} {filename}', buttons, box, self.confirm_print_response, filename)
 
+    def preview_ready(self, path, datas):
+        if self.preview is not None and path == self.preview_path:
+            self.preview.set_store(datas[GCODE_DATA.index(LayerStore)])
+
     def confirm_print_response(self, dialog, response_id, filename):
+        self.preview = None
         self._gtk.remove_dialog(dialog)
         if response_id == Gtk.ResponseType.OK:
             logging.info(f"Starting print: {filename}")
@@ -135,6 +135,9 @@ class Panel(ScreenPanel):
         # Send at least two commands, with my accelerometer the first command after a reboot will fail
         self._screen._ws.klippy.gcode_script('MEASURE_AXES_NOISE')
 
+    def subscriptions(self):
+        return {"toolhead": ["homed_axes"]}
+
     def process_update(self, action, data):
         if action != "notify_gcode_response":
             return
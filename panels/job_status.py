@@ -5,11 +5,19 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib, Gtk, Pango
+from collections import deque
 from math import pi, sqrt, trunc
-from statistics import median
 from time import time
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.KlippyGtk import find_widget
+from ks_includes.gcodeindex import load_file
+from ks_includes.gcodepreview import GCODE_DATA
+from ks_includes.streamstats import StreamStats
+from ks_includes.widgets.flowgraph import FlowGraph
+from ks_includes.widgets.layerpreview import LayerPreview
+
+# Flow intervals of 2s kept for the graph
+FLOW_HISTORY = 60
 
 
 class Panel(ScreenPanel):
@@ -33,7 +41,12 @@ class Panel(ScreenPanel):
         self.state = "standby"
         self.timeleft_type = "auto"
         self.progress = self.zoffset = self.flowrate = self.vel = 0.0
-        self.flowstore = []
+        # Flow samples are aggregated as they arrive, each interval ends up as (min, median, max) in the history
+        self.flow_stats = StreamStats()
+        self.flow_history = deque(maxlen=FLOW_HISTORY)
+        # Byte offset to time and layer index of the gcode, only when the file is readable locally
+        self.gcode_index = self.gcode_index_path = None
+        self.layer_store = self.preview = None
         self.mm = _("mm")
         self.mms = _("mm/s")
         self.mms2 = _("mm/s²")
@@ -141,6 +154,9 @@ class Panel(ScreenPanel):
         }
         for button in buttons:
             buttons[button].set_halign(Gtk.Align.START)
+        for button in ('elapsed', 'left'):
+            # Written through their label, set_label on the button would rebuild its child on every change
+            self.labels[f'{button}_button'] = find_widget(buttons[button], Gtk.Label)
         buttons['fan'].connect("clicked", self.menu_item_clicked, {"panel": "fan"})
         self.buttons.update(buttons)
 
@@ -244,6 +260,8 @@ class Panel(ScreenPanel):
         info.attach(self.labels['filament_used'], 2, 3, 1, 1)
         info.attach(self.labels['fila_total_lbl'], 1, 4, 1, 1)
         info.attach(self.labels['filament_total'], 2, 4, 1, 1)
+        self.labels['flow_graph'] = FlowGraph(self._gtk.font_size, self.flow_history, self.mms3)
+        info.attach(self.labels['flow_graph'], 1, 5, 2, 1)
         self.extrusion_grid = info
         self.buttons['extrusion'].connect("clicked", self.switch_info, self.extrusion_grid)
 
@@ -326,14 +344,58 @@ class Panel(ScreenPanel):
         ctx.arc(0, 0, r, 3 / 2 * pi, 3 / 2 * pi + (self.progress * 2 * pi))
         ctx.stroke()
 
+    def subscriptions(self):
+        requested = {
+            "gcode_move": ["extrude_factor", "gcode_position", "homing_origin", "speed_factor", "speed"],
+            "toolhead": ["extruder", "max_accel"],
+            "motion_report": ["live_position", "live_velocity", "live_extruder_velocity"],
+            "exclude_object": ["objects"],
+        }
+        for extruder in self._printer.get_tools():
+            requested[extruder] = ["pressure_advance"]
+        for fan in self.fans:
+            requested[fan] = ["speed"]
+        return requested
+
     def activate(self):
         if self.flow_timeout is None:
-            self.flow_timeout = GLib.timeout_add_seconds(2, self.update_flow)
+            self.flow_timeout = self._screen.timers.add(2, self.update_flow, group="display")
+            # The flowrate uses every sample, the labels are rate limited
+            self._screen.rate_limiter.add_listener("motion_report", "live_position", self.add_position_sample)
+            self._screen.rate_limiter.add_listener("motion_report", "live_extruder_velocity", self.add_velocity_sample)
+            for fan in self.fans:
+                self._printer.add_observer(fan, "speed", self.update_fan_speed)
+                self.update_fan_speed(fan, "speed", self._printer.get_stat(fan, "speed"))
 
     def deactivate(self):
         if self.flow_timeout is not None:
-            GLib.source_remove(self.flow_timeout)
+            self._screen.timers.remove(self.flow_timeout)
             self.flow_timeout = None
+            self._screen.rate_limiter.remove_listener("motion_report", "live_position", self.add_position_sample)
+            self._screen.rate_limiter.remove_listener("motion_report", "live_extruder_velocity",
+                                                      self.add_velocity_sample)
+            for fan in self.fans:
+                self._printer.remove_observer(fan, "speed", self.update_fan_speed)
+            self.prev_pos = None
+
+    def update_fan_speed(self, fan, field, speed):
+        if fan in self.fans:
+            self.fans[fan]['speed'] = f"{self._printer.get_fan_speed(fan) * 100:3.0f}%"
+        fan_label = "".join(f" {self.fans[fan]['name']}{self.fans[fan]['speed']}" for fan in self.fans)
+        if fan_label:
+            self.buttons['fan'].set_label(fan_label[:12])
+
+    def add_position_sample(self, pos):
+        now = time()
+        if self.prev_pos is not None and now > self.prev_pos[1]:
+            interval = (now - self.prev_pos[1])
+            # Calculate Flowrate
+            evelocity = (pos[3] - self.prev_pos[0][3]) / interval
+            self.flow_stats.add(self.fila_section * evelocity)
+        self.prev_pos = [pos, now]
+
+    def add_velocity_sample(self, velocity):
+        self.flow_stats.add(self.fila_section * float(velocity))
 
     def create_buttons(self):
 
@@ -371,9 +433,9 @@ class Panel(ScreenPanel):
         elif device == "endstop":
             saved_z_offset = None
             msg = _("Apply %s%.3f offset to Endstop?") % (sign, abs(self.zoffset))
-            if 'stepper_z' in self._printer.get_config_section_list():
+            if self._printer.config_section_exists('stepper_z'):
                 saved_z_offset = self._printer.get_config_section('stepper_z')['position_endstop']
-            elif 'stepper_a' in self._printer.get_config_section_list():
+            elif self._printer.config_section_exists('stepper_a'):
                 saved_z_offset = self._printer.get_config_section('stepper_a')['position_endstop']
             if saved_z_offset:
                 msg += "\n\n" + _("Saved offset: %s") % saved_z_offset
@@ -456,6 +518,7 @@ class Panel(ScreenPanel):
             logging.info("reseting progress")
             self._printer.data["virtual_sdcard"]["progress"] = 0
         self.update_progress(0.0)
+        self.flow_history.clear()
 
     def process_update(self, action, data):
         if action == "notify_gcode_response":
@@ -481,12 +544,13 @@ class Panel(ScreenPanel):
                     digits=0
                 )
                 if x in self.buttons['extruder']:
-                    self.buttons['extruder'][x].set_label(self.labels[x].get_text())
+                    self.cache.set_label(self.buttons['extruder'][x], self.labels[x].get_text())
                 elif x in self.buttons['heater']:
-                    self.buttons['heater'][x].set_label(self.labels[x].get_text())
+                    self.cache.set_label(self.buttons['heater'][x], self.labels[x].get_text())
 
         if "display_status" in data and "message" in data["display_status"]:
-            self.labels['lcdmessage'].set_label(
+            self.cache.set_label(
+                self.labels['lcdmessage'],
                 f"{data['display_status']['message'] if data['display_status']['message'] is not None else ''}"
             )
 
@@ -498,59 +562,49 @@ class Panel(ScreenPanel):
                 self.labels['temp_grid'].attach(self.buttons['extruder'][self.current_extruder], 0, 0, 1, 1)
                 self._screen.show_all()
             if "max_accel" in data["toolhead"]:
-                self.labels['max_accel'].set_label(f"{data['toolhead']['max_accel']:.0f} {self.mms2}")
+                self.cache.set_label(self.labels['max_accel'], f"{data['toolhead']['max_accel']:.0f} {self.mms2}")
         if 'extruder' in data and 'pressure_advance' in data['extruder']:
-            self.labels['advance'].set_label(f"{data['extruder']['pressure_advance']:.2f}")
+            self.cache.set_label(self.labels['advance'], f"{data['extruder']['pressure_advance']:.2f}")
 
         if 'gcode_move' in data:
             if 'gcode_position' in data['gcode_move']:
                 self.pos_z = round(float(data['gcode_move']['gcode_position'][2]), 2)
-                self.buttons['z'].set_label(f"Z: {self.pos_z:6.2f}{f'/{self.oheight}' if self.oheight > 0 else ''}")
+                self.cache.set_label(
+                    self.buttons['z'], f"Z: {self.pos_z:6.2f}{f'/{self.oheight}' if self.oheight > 0 else ''}"
+                )
             if 'extrude_factor' in data['gcode_move']:
                 self.extrusion = round(float(data['gcode_move']['extrude_factor']) * 100)
-                self.labels['extrude_factor'].set_label(f"{self.extrusion:3}%")
+                self.cache.set_label(self.labels['extrude_factor'], f"{self.extrusion:3}%")
             if 'speed_factor' in data['gcode_move']:
                 self.speed = round(float(data['gcode_move']['speed_factor']) * 100)
                 self.speed_factor = float(data['gcode_move']['speed_factor'])
-                self.labels['speed_factor'].set_label(f"{self.speed:3}%")
+                self.cache.set_label(self.labels['speed_factor'], f"{self.speed:3}%")
             if 'speed' in data['gcode_move']:
                 self.req_speed = round(float(data["gcode_move"]["speed"]) / 60 * self.speed_factor)
-                self.labels['req_speed'].set_label(
+                self.cache.set_label(
+                    self.labels['req_speed'],
                     f"{self.speed}% {self.vel:3.0f}/{self.req_speed:3.0f} "
                     f"{f'{self.mms}' if self.vel < 1000 and self.req_speed < 1000 and self._screen.width > 500 else ''}"
                 )
-                self.buttons['speed'].set_label(self.labels['req_speed'].get_label())
+                self.cache.set_label(self.buttons['speed'], self.labels['req_speed'].get_label())
             if 'homing_origin' in data['gcode_move']:
                 self.zoffset = float(data['gcode_move']['homing_origin'][2])
-                self.labels['zoffset'].set_label(f"{self.zoffset:.3f} {self.mm}")
+                self.cache.set_label(self.labels['zoffset'], f"{self.zoffset:.3f} {self.mm}")
         if 'motion_report' in data:
             if 'live_position' in data['motion_report']:
-                self.labels['pos_x'].set_label(f"X: {data['motion_report']['live_position'][0]:6.2f}")
-                self.labels['pos_y'].set_label(f"Y: {data['motion_report']['live_position'][1]:6.2f}")
-                self.labels['pos_z'].set_label(f"Z: {data['motion_report']['live_position'][2]:6.2f}")
-                pos = data["motion_report"]["live_position"]
-                now = time()
-                if self.prev_pos is not None:
-                    interval = (now - self.prev_pos[1])
-                    # Calculate Flowrate
-                    evelocity = (pos[3] - self.prev_pos[0][3]) / interval
-                    self.flowstore.append(self.fila_section * evelocity)
-                self.prev_pos = [pos, now]
+                if self.preview is not None:
+                    self.update_preview(data['motion_report']['live_position'])
+                self.cache.set_label(self.labels['pos_x'], f"X: {data['motion_report']['live_position'][0]:6.2f}")
+                self.cache.set_label(self.labels['pos_y'], f"Y: {data['motion_report']['live_position'][1]:6.2f}")
+                self.cache.set_label(self.labels['pos_z'], f"Z: {data['motion_report']['live_position'][2]:6.2f}")
             if 'live_velocity' in data['motion_report']:
                 self.vel = float(data["motion_report"]["live_velocity"])
-                self.labels['req_speed'].set_label(
+                self.cache.set_label(
+                    self.labels['req_speed'],
                     f"{self.speed}% {self.vel:3.0f}/{self.req_speed:3.0f} "
                     f"{f'{self.mms}' if self.vel < 1000 and self.req_speed < 1000 and self._screen.width > 500 else ''}"
                 )
-                self.buttons['speed'].set_label(self.labels['req_speed'].get_label())
-            if 'live_extruder_velocity' in data['motion_report']:
-                self.flowstore.append(self.fila_section * float(data["motion_report"]["live_extruder_velocity"]))
-        fan_label = ""
-        for fan in self.fans:
-            self.fans[fan]['speed'] = f"{self._printer.get_fan_speed(fan) * 100:3.0f}%"
-            fan_label += f" {self.fans[fan]['name']}{self.fans[fan]['speed']}"
-        if fan_label:
-            self.buttons['fan'].set_label(fan_label[:12])
+                self.cache.set_label(self.buttons['speed'], self.labels['req_speed'].get_label())
         if "print_stats" in data:
             if 'state' in data['print_stats']:
                 self.set_state(
@@ -560,21 +614,27 @@ class Panel(ScreenPanel):
             if 'filename' in data['print_stats']:
                 self.update_filename(data['print_stats']["filename"])
             if 'filament_used' in data['print_stats']:
-                self.labels['filament_used'].set_label(
+                self.cache.set_label(
+                    self.labels['filament_used'],
                     f"{float(data['print_stats']['filament_used']) / 1000:.1f} m"
                 )
             if 'info' in data["print_stats"]:
                 if ('total_layer' in data['print_stats']['info']
                         and data["print_stats"]['info']['total_layer'] is not None):
-                    self.labels['total_layers'].set_label(f"{data['print_stats']['info']['total_layer']}")
+                    self.cache.set_label(self.labels['total_layers'], f"{data['print_stats']['info']['total_layer']}")
                 if ('current_layer' in data['print_stats']['info']
                         and data['print_stats']['info']['current_layer'] is not None):
-                    self.labels['layer'].set_label(
+                    self.cache.set_label(
+                        self.labels['layer'],
                         f"{data['print_stats']['info']['current_layer']} / "
                         f"{self.labels['total_layers'].get_text()}"
                     )
+            elif self.gcode_index is not None:
+                _, layer, _ = self.gcode_index.lookup(self._printer.get_stat('virtual_sdcard', 'file_position') or 0)
+                self.cache.set_label(self.labels['layer'], f"{layer} / {self.gcode_index.total_layers}")
             elif "layer_height" in self.file_metadata and "object_height" in self.file_metadata:
-                self.labels['layer'].set_label(
+                self.cache.set_label(
+                    self.labels['layer'],
                     f"{1 + round((self.pos_z - self.f_layer_h) / self.layer_h)} / "
                     f"{self.labels['total_layers'].get_text()}"
                 )
@@ -582,12 +642,14 @@ class Panel(ScreenPanel):
                 self.update_time_left()
 
     def update_flow(self):
-        if not self.flowstore:
-            self.flowstore.append(0)
-        self.flowrate = median(self.flowstore)
-        self.flowstore = []
-        self.labels['flowrate'].set_label(f"{self.flowrate:.1f} {self.mms3}")
-        self.buttons['extrusion'].set_label(f"{self.extrusion:3}% {self.flowrate:5.1f} {self.mms3}")
+        stats = self.flow_stats
+        self.flowrate = stats.quantile
+        self.flow_history.append((stats.minimum or 0, self.flowrate, stats.maximum or 0))
+        stats.reset()
+        if self.extrusion_grid is not None and self.extrusion_grid.get_mapped():
+            self.labels['flow_graph'].queue_draw()
+        self.cache.set_label(self.labels['flowrate'], f"{self.flowrate:.1f} {self.mms3}")
+        self.cache.set_label(self.buttons['extrusion'], f"{self.extrusion:3}% {self.flowrate:5.1f} {self.mms3}")
         return True
 
     def update_time_left(self):
@@ -600,17 +662,16 @@ class Panel(ScreenPanel):
                         self.file_metadata['gcode_start_byte']))
         else:
             progress = self._printer.get_stat('virtual_sdcard', 'progress')
-        self.labels["duration"].set_label(self.format_time(total_duration))
+        self.cache.set_label(self.labels["duration"], self.format_time(total_duration))
         elapsed_label = f"{self.labels['elapsed'].get_text()}  {self.labels['duration'].get_text()}"
-        self.buttons['elapsed'].set_label(elapsed_label)
-        find_widget(self.buttons['elapsed'], Gtk.Label).set_ellipsize(Pango.EllipsizeMode.END)
+        self.cache.set_label(self.labels['elapsed_button'], elapsed_label)
         estimated = slicer_time = filament_time = file_time = 0
         timeleft_type = self._config.get_config()['main'].get('print_estimate_method', 'auto')
 
         if 'estimated_time' in self.file_metadata and self.file_metadata['estimated_time'] > 1:
             spdcomp = sqrt(self.speed_factor)
             slicer_time = ((self.file_metadata['estimated_time']) / spdcomp)
-            self.labels["slicer_time"].set_label(self.format_time(slicer_time))
+            self.cache.set_label(self.labels["slicer_time"], self.format_time(slicer_time))
             if print_duration < 1:
                 print_duration = slicer_time * progress
         elif print_duration < 1:  # No-extrusion
@@ -618,10 +679,17 @@ class Panel(ScreenPanel):
 
         if 'filament_total' in self.file_metadata and self.file_metadata['filament_total'] >= fila_used > 0:
             filament_time = (print_duration / (fila_used / self.file_metadata['filament_total']))
-            self.labels["filament_time"].set_label(self.format_time(filament_time))
+            self.cache.set_label(self.labels["filament_time"], self.format_time(filament_time))
         if progress > 0:
             file_time = (print_duration / progress)
-            self.labels["file_time"].set_label(self.format_time(file_time))
+            self.cache.set_label(self.labels["file_time"], self.format_time(file_time))
+
+        index_time = 0
+        if self.gcode_index is not None:
+            fraction = self.gcode_index.lookup(self._printer.get_stat('virtual_sdcard', 'file_position') or 0)[0]
+            if fraction > 0.01:
+                # The estimate of the index is calibrated against the actual duration of what was printed
+                index_time = print_duration / fraction
 
         if timeleft_type == "file":
             estimated = file_time
@@ -629,6 +697,8 @@ class Panel(ScreenPanel):
             estimated = filament_time
         elif timeleft_type == "slicer":
             estimated = slicer_time
+        elif index_time > 1:  # Auto with a local index
+            estimated = slicer_time if progress < 0.05 and slicer_time > 1 else index_time
         elif estimated < 1:  # Auto
             if print_duration < slicer_time > 1:
                 if progress < 0.15:
@@ -646,16 +716,15 @@ class Panel(ScreenPanel):
                 estimated = file_time
         if estimated > 1:
             progress = min(max(print_duration / estimated, 0), 1)
-            self.labels["est_time"].set_label(self.format_time(estimated))
-            self.labels["time_left"].set_label(self.format_eta(estimated, print_duration))
+            self.cache.set_label(self.labels["est_time"], self.format_time(estimated))
+            self.cache.set_label(self.labels["time_left"], self.format_eta(estimated, print_duration))
             remaining_label = f"{self.labels['left'].get_text()}  {self.labels['time_left'].get_text()}"
-            self.buttons['left'].set_label(remaining_label)
-            find_widget(self.buttons['left'], Gtk.Label).set_ellipsize(Pango.EllipsizeMode.END)
+            self.cache.set_label(self.labels['left_button'], remaining_label)
         self.update_progress(progress)
 
     def update_progress(self, progress: float):
         self.progress = progress
-        self.labels['progress_text'].set_label(f"{trunc(progress * 100)}%")
+        self.cache.set_label(self.labels['progress_text'], f"{trunc(progress * 100)}%")
         self.labels['darea'].queue_draw()
 
     def set_state(self, state, msg=""):
@@ -666,7 +735,7 @@ class Panel(ScreenPanel):
         elif state == "complete":
             self.update_progress(1)
             self._screen.set_panel_title(_("Complete"))
-            self.buttons['left'].set_label("-")
+            self.cache.set_label(self.labels['left_button'], "-")
             self._add_timeout(self._config.get_main_config().getint("job_complete_timeout", 0))
         elif state == "error":
             self._screen.set_panel_title(_("Error"))
@@ -756,6 +825,14 @@ class Panel(ScreenPanel):
             image.set_from_pixbuf(pixbuf)
 
     def show_fullscreen_thumbnail(self, widget):
+        if self.layer_store is not None:
+            # The layer being printed is shown instead of the thumbnail when the gcode could be parsed
+            self.preview = LayerPreview(self._gtk.font_size)
+            self.preview.set_size_request(-1, self._screen.height * .75)
+            self.preview.set_store(self.layer_store)
+            self.update_preview(self._printer.get_stat("motion_report", "live_position"))
+            self._gtk.Dialog(self.filename, None, self.preview, self.close_fullscreen_thumbnail)
+            return
         pixbuf = self.get_file_image(self.filename, self._screen.width * .9, self._screen.height * .75)
         if pixbuf is None:
             return
@@ -764,8 +841,14 @@ class Panel(ScreenPanel):
         self._gtk.Dialog(self.filename, None, image, self.close_fullscreen_thumbnail)
 
     def close_fullscreen_thumbnail(self, dialog, response_id):
+        self.preview = None
         self._gtk.remove_dialog(dialog)
 
+    def release(self):
+        if self.animation_timeout is not None:
+            GLib.source_remove(self.animation_timeout)
+            self.animation_timeout = None
+
     def update_filename(self, filename):
         if not filename:
             return
@@ -774,7 +857,7 @@ class Panel(ScreenPanel):
             self.animation_timeout = None
         self.filename = filename
         logging.debug(f"Updating filename to {filename}")
-        self.labels["file"].set_label(os.path.splitext(self.filename)[0])
+        self.cache.set_label(self.labels["file"], os.path.splitext(self.filename)[0])
         self.filename_label = {
             "complete": self.labels['file'].get_label(),
             "current": self.labels['file'].get_label(),
@@ -786,16 +869,44 @@ class Panel(ScreenPanel):
             self.animation_timeout = None
         self.update_file_metadata()
 
+    def load_gcode_index(self):
+        if self._files.gcodes_path is None:
+            return
+        path = os.path.join(self._files.gcodes_path, self.filename)
+        if path == self.gcode_index_path or not os.access(path, os.R_OK):
+            return
+        self.gcode_index_path = path
+        self.gcode_index = self.layer_store = None
+        load_file(path, GCODE_DATA, self.gcode_data_ready)
+
+    def gcode_data_ready(self, path, datas):
+        if path != self.gcode_index_path:
+            return
+        index, store = datas
+        self.gcode_index = index
+        if index is not None and index.total_layers:
+            self.cache.set_label(self.labels['total_layers'], f"{index.total_layers}")
+        self.layer_store = store
+        if self.preview is not None:
+            self.preview.set_store(store)
+            self.update_preview(self._printer.get_stat("motion_report", "live_position"))
+
+    def update_preview(self, position):
+        if self.layer_store is None:
+            return
+        layer = self.layer_store.layer_at(self._printer.get_stat('virtual_sdcard', 'file_position') or 0)
+        self.preview.set_current(layer, position[:2] if position else None)
+
     def animate_label(self):
         if not self.filename_label or not self.animation_timeout:
             return False
         ellipsized = self.labels['file'].get_layout().is_ellipsized()
         if ellipsized:
             self.filename_label['current'] = self.filename_label['current'][1:]
-            self.labels['file'].set_label(self.filename_label['current'] + " " * 6)
+            self.cache.set_label(self.labels['file'], self.filename_label['current'] + " " * 6)
         else:
             self.filename_label['current'] = self.filename_label['complete']
-            self.labels['file'].set_label(self.filename_label['complete'])
+            self.cache.set_label(self.labels['file'], self.filename_label['complete'])
         return True
 
     def update_file_metadata(self, response=False):
@@ -803,19 +914,24 @@ class Panel(ScreenPanel):
             self.file_metadata = self._files.get_file_info(self.filename)
             logging.info(f"Update Metadata. File: {self.filename} Size: {self.file_metadata['size']}")
             if "estimated_time" in self.file_metadata and self.timeleft_type == "slicer":
-                self.labels["est_time"].set_label(self.format_time(self.file_metadata['estimated_time']))
+                self.cache.set_label(self.labels["est_time"], self.format_time(self.file_metadata['estimated_time']))
             if "object_height" in self.file_metadata:
                 self.oheight = float(self.file_metadata['object_height'])
-                self.labels['height'].set_label(f"{self.oheight} {self.mm}")
+                self.cache.set_label(self.labels['height'], f"{self.oheight} {self.mm}")
                 if "layer_height" in self.file_metadata:
                     self.layer_h = float(self.file_metadata['layer_height'])
                     if "first_layer_height" in self.file_metadata:
                         self.f_layer_h = float(self.file_metadata['first_layer_height'])
                     else:
                         self.f_layer_h = self.layer_h
-                    self.labels['total_layers'].set_label(f"{((self.oheight - self.f_layer_h) / self.layer_h) + 1:.0f}")
+                    self.cache.set_label(
+                        self.labels['total_layers'], f"{((self.oheight - self.f_layer_h) / self.layer_h) + 1:.0f}"
+                    )
             if "filament_total" in self.file_metadata:
-                self.labels['filament_total'].set_label(f"{float(self.file_metadata['filament_total']) / 1000:.1f} m")
+                self.cache.set_label(
+                    self.labels['filament_total'], f"{float(self.file_metadata['filament_total']) / 1000:.1f} m"
+                )
+            self.load_gcode_index()
         elif not response:
             logging.debug("Cannot find file metadata. Listening for updated metadata")
             self._files.request_metadata(self.filename)
@@ -36,6 +36,9 @@ class Panel(ScreenPanel):
             or (idx == 3 and 'W' in self.color_order)
         )
 
+    def subscriptions(self):
+        return {led: ["color_data"] for led in self._printer.get_leds()}
+
     def activate(self):
         if self.current_led is not None:
             self.set_title(f"{self.current_led}")
@@ -52,6 +52,9 @@ class Panel(ScreenPanel):
         self.content.add(scroll)
         self.content.show_all()
 
+    def subscriptions(self):
+        return {"toolhead": ["max_accel", "minimum_cruise_ratio", "max_velocity", "square_corner_velocity"]}
+
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
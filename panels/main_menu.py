@@ -2,7 +2,7 @@ import logging
 import gi
 
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, GLib
+from gi.repository import Gtk
 from panels.menu import Panel as MenuPanel
 from ks_includes.widgets.heatergraph import HeaterGraph
 from ks_includes.widgets.keypad import Keypad
@@ -60,11 +60,11 @@ class Panel(MenuPanel):
             self.labels['da'].show()
             if self.graph_update is None:
                 # This has a high impact on load
-                self.graph_update = GLib.timeout_add_seconds(5, self.update_graph)
+                self.graph_update = self._screen.timers.add(5, self.update_graph, group="display")
         elif self.labels['da'] in self.left_panel:
             self.left_panel.remove(self.labels['da'])
             if self.graph_update is not None:
-                GLib.source_remove(self.graph_update)
+                self._screen.timers.remove(self.graph_update)
                 self.graph_update = None
         return False
 
@@ -75,7 +75,7 @@ class Panel(MenuPanel):
 
     def deactivate(self):
         if self.graph_update is not None:
-            GLib.source_remove(self.graph_update)
+            self._screen.timers.remove(self.graph_update)
             self.graph_update = None
         if self.active_heater is not None:
             self.hide_numpad()
@@ -4,7 +4,6 @@ import gi
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk
-from jinja2 import Template
 from ks_includes.screen_panel import ScreenPanel
 from ks_includes.widgets.autogrid import AutoGrid
 
@@ -14,14 +13,12 @@ class Panel(ScreenPanel):
     def __init__(self, screen, title, items=None):
         super().__init__(screen, title)
         self.items = items
-        self.j2_data = self._printer.get_printer_status_data()
         self.create_menu_items()
         self.scroll = self._gtk.ScrolledWindow()
         self.scroll.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
         self.autogrid = AutoGrid()
 
     def activate(self):
-        self.j2_data = self._printer.get_printer_status_data()
         self.add_content()
 
     def add_content(self):
@@ -50,9 +47,9 @@ class Panel(ScreenPanel):
             key = list(self.items[i])[0]
             item = self.items[i][key]
 
-            name = self._screen.env.from_string(item['name']).render(self.j2_data)
-            icon = self._screen.env.from_string(item['icon']).render(self.j2_data) if item['icon'] else None
-            style = self._screen.env.from_string(item['style']).render(self.j2_data) if item['style'] else None
+            name = self._screen.render_template(item['name'])
+            icon = self._screen.render_template(item['icon']) if item['icon'] else None
+            style = self._screen.render_template(item['style']) if item['style'] else None
 
             b = self._gtk.Button(icon, name, style or f"color{i % 4 + 1}", scale=scale)
 
@@ -63,7 +60,7 @@ class Panel(ScreenPanel):
 
                 if item['params'] is not False:
                     try:
-                        p = self._screen.env.from_string(item['params']).render(self.j2_data)
+                        p = self._screen.render_template(item['params'])
                         params = json.loads(p)
                     except Exception as e:
                         logging.exception(f"Unable to parse parameters for [{name}]:\n{e}")
@@ -82,8 +79,7 @@ class Panel(ScreenPanel):
             logging.info(f"moonraker connected {self._screen._ws.connected}")
             return self._screen._ws.connected
         try:
-            j2_temp = Template(enable, autoescape=True)
-            return j2_temp.render(self.j2_data) == 'True'
+            return self._screen.render_template(enable) == 'True'
         except Exception as e:
             logging.debug(f"Error evaluating enable statement: {enable}\n{e}")
             return False
@@ -209,6 +209,12 @@ class Panel(ScreenPanel):
         self._screen.panels_reinit.append("zcalibrate")
         self.menu.clear()
 
+    def subscriptions(self):
+        return {
+            "gcode_move": ["gcode_position", "absolute_coordinates"],
+            "toolhead": ["homed_axes", "max_velocity"],
+        }
+
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
@@ -6,7 +6,6 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, GLib, Pango
 from ks_includes.screen_panel import ScreenPanel
-from ks_includes.sdbus_nm import SdbusNm
 
 
 class Panel(ScreenPanel):
@@ -15,7 +14,13 @@ class Panel(ScreenPanel):
         title = title or _("Network")
         super().__init__(screen, title)
         self.show_add = False
+        # Changes are only applied while the panel is shown
+        self.active = False
+        if getattr(self, "sdbus_nm", None) is not None:
+            # A reinit runs __init__ again on the same panel, the previous monitor has to go
+            self.sdbus_nm.stop_monitor()
         try:
+            from ks_includes.sdbus_nm import SdbusNm  # Deferred, D-Bus is slow to load
             self.sdbus_nm = SdbusNm(self.popup_callback)
         except Exception as e:
             logging.exception("Failed to initialize")
@@ -42,7 +47,6 @@ class Panel(ScreenPanel):
             self.content.add(self.error_box)
             self._screen.panels_reinit.append(self._screen._cur_panels[-1])
             return
-        self.update_timeout = None
         self.network_list = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, hexpand=True, vexpand=True)
         self.network_rows = {}
         self.networks = {}
@@ -92,10 +96,8 @@ class Panel(ScreenPanel):
 
         if self.sdbus_nm.wifi:
             self.labels['main_box'].pack_start(sbox, False, False, 5)
-            GLib.idle_add(self.load_networks)
             scroll.add(self.network_list)
             self.sdbus_nm.enable_monitoring(True)
-            self.conn_status = GLib.timeout_add_seconds(1, self.sdbus_nm.monitor_connection_status)
         else:
             self._screen.show_popup_message(_("No wireless interface has been found"), level=2)
             self.labels['networkinfo'] = Gtk.Label()
@@ -104,22 +106,32 @@ class Panel(ScreenPanel):
 
         self.labels['main_box'].pack_start(scroll, True, True, 0)
         self.content.add(self.labels['main_box'])
+        # The list is refreshed from NetworkManager signals instead of polling
+        self.sdbus_nm.start_monitor(self.network_changed)
 
     def popup_callback(self, msg, level=3):
         self._screen.show_popup_message(msg, level)
 
+    def network_changed(self):
+        if not self.active:
+            return
+        if self.sdbus_nm.wifi:
+            self.update_all_networks()
+        else:
+            self.update_single_network_info()
+
     def load_networks(self):
         for net in self.sdbus_nm.get_networks():
-            self.add_network(net['BSSID'])
+            self.add_network(net)
         GLib.timeout_add_seconds(10, self._gtk.Button_busy, self.reload_button, False)
         self.content.show_all()
         return False
 
-    def add_network(self, bssid):
+    def add_network(self, net):
+        bssid = net['BSSID']
         if bssid in self.network_rows:
             return
 
-        net = next(net for net in self.sdbus_nm.get_networks() if bssid == net['BSSID'])
         ssid = net['SSID']
 
         connect = self._gtk.Button("load", None, "color3", self.bts)
@@ -284,23 +296,19 @@ class Panel(ScreenPanel):
         self.show_add = True
 
     def update_all_networks(self):
-        self.interface = self.sdbus_nm.get_primary_interface()
+        self.interface = self.sdbus_nm.primary_interface
         self.labels['interface'].set_text(_("Interface") + f': {self.interface}')
-        self.labels['ip'].set_text(f"IP: {self.sdbus_nm.get_ip_address()}")
+        self.labels['ip'].set_text(f"IP: {self.sdbus_nm.ip_address}")
         nets = self.sdbus_nm.get_networks()
-        remove = [bssid for bssid in self.network_rows.keys() if bssid not in [net['BSSID'] for net in nets]]
-        for bssid in remove:
+        current = {net['BSSID'] for net in nets}
+        for bssid in [bssid for bssid in self.network_rows if bssid not in current]:
             self.remove_network_from_list(bssid)
-        for net in nets:
-            if net['BSSID'] not in self.network_rows.keys():
-                self.add_network(net['BSSID'])
-            self.update_network_info(net)
         for i, net in enumerate(nets):
-            for child in self.network_list.get_children():
-                if child == self.network_rows[net['BSSID']]:
-                    self.network_list.reorder_child(child, i)
+            if net['BSSID'] not in self.network_rows:
+                self.add_network(net)
+            self.update_network_info(net)
+            self.network_list.reorder_child(self.network_rows[net['BSSID']], i)
         self.network_list.show_all()
-        return True
 
     def update_network_info(self, net):
         if net['BSSID'] not in self.network_rows.keys() or net['BSSID'] not in self.networks:
@@ -332,13 +340,13 @@ class Panel(ScreenPanel):
             return self.wifi_signal_icons['weak']
 
     def update_single_network_info(self):
+        self.interface = self.sdbus_nm.primary_interface
         self.labels['networkinfo'].set_markup(
             f'<b>{self.interface}</b>\n\n'
             + '<b>' + _("Hostname") + f':</b> {os.uname().nodename}\n'
-            f'<b>IPv4:</b> {self.sdbus_nm.get_ip_address()}\n'
+            f'<b>IPv4:</b> {self.sdbus_nm.ip_address}\n'
         )
         self.labels['networkinfo'].show_all()
-        return True
 
     def reload_networks(self, widget=None):
         self.deactivate()
@@ -356,27 +364,29 @@ class Panel(ScreenPanel):
     def activate(self):
         if self.sdbus_nm is None:
             return
-        if self.update_timeout is None:
-            if self.sdbus_nm.wifi:
-                if self.reload_button.get_sensitive():
-                    self._gtk.Button_busy(self.reload_button, True)
-                    self.sdbus_nm.rescan()
-                    self.load_networks()
-                self.update_all_networks()
-                self.update_timeout = GLib.timeout_add_seconds(5, self.update_all_networks)
-            else:
-                self.update_single_network_info()
-                self.update_timeout = GLib.timeout_add_seconds(5, self.update_single_network_info)
+        self.active = True
+        if self.sdbus_nm.wifi:
+            self.sdbus_nm.enable_monitoring(True)
+            if self.reload_button.get_sensitive():
+                self._gtk.Button_busy(self.reload_button, True)
+                self.sdbus_nm.rescan()
+                self.load_networks()
+            self.update_all_networks()
+        else:
+            self.update_single_network_info()
 
     def deactivate(self):
         if self.sdbus_nm is None:
             return
-        if self.update_timeout is not None:
-            GLib.source_remove(self.update_timeout)
-            self.update_timeout = None
+        self.active = False
         if self.sdbus_nm.wifi:
             self.sdbus_nm.enable_monitoring(False)
 
+    def release(self):
+        if self.sdbus_nm is None:
+            return
+        self.sdbus_nm.stop_monitor()
+
     def toggle_wifi(self, switch, gparams):
         enable = switch.get_active()
         if enable:
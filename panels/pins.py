@@ -92,6 +92,9 @@ class Panel(ScreenPanel):
             widget.set_sensitive(True)
         return False
 
+    def subscriptions(self):
+        return {pin: ["value"] for pin in self.devices}
+
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
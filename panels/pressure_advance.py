@@ -115,6 +115,12 @@ class Panel(ScreenPanel):
                 f"SET_PRESSURE_ADVANCE EXTRUDER={self.current_extruder} SMOOTH_TIME={value}"
             )
 
+    def subscriptions(self):
+        requested = {"toolhead": ["extruder"]}
+        for extruder in self._printer.get_tools():
+            requested[extruder] = ["pressure_advance", "smooth_time"]
+        return requested
+
     def process_update(self, action, data):
         if action != "notify_status_update":
             return
@@ -60,6 +60,11 @@ class Panel(ScreenPanel):
         self.content.add(scroll)
         self.content.show_all()
 
+    def subscriptions(self):
+        return {
+            "firmware_retraction": ["retract_length", "retract_speed", "unretract_extra_length", "unretract_speed"]
+        }
+
     def activate(self):
         self._screen._ws.klippy.gcode_script("GET_RETRACTION")
 
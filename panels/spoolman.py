@@ -6,7 +6,7 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, GdkPixbuf, GObject, Pango, Gdk
 from ks_includes.screen_panel import ScreenPanel
-from ks_includes.KlippyRest import KlippyRest
+from ks_includes.spoolman import SpoolmanCatalogue
 from datetime import datetime
 
 try:
@@ -87,6 +87,8 @@ class SpoolmanSpool(GObject.GObject):
         for date in ["first_used", "last_used", "registered"]:
             if date in entries:
                 self.__setattr__(date, format_date(entries[date]))
+        # Precomputed so sorting doesn't build datetimes for every comparison
+        self.last_used_key = self.last_used.timestamp() if self.last_used else 0
 
     @property
     def name(self):
@@ -118,7 +120,6 @@ class SpoolmanSpool(GObject.GObject):
 
 
 class Panel(ScreenPanel):
-    apiClient: KlippyRest
     _active_spool_id: int = None
 
     @staticmethod
@@ -129,14 +130,15 @@ class Panel(ScreenPanel):
 
     @staticmethod
     def spool_compare_date(model, row1, row2, user_data):
-        spool1 = model.get_value(row1, 0)
-        spool2 = model.get_value(row2, 0)
-        return 1 if (spool1.last_used or datetime.min).replace(tzinfo=None) > \
-                    (spool2.last_used or datetime.min).replace(tzinfo=None) else -1
+        key1 = model.get_value(row1, 0).last_used_key
+        key2 = model.get_value(row2, 0).last_used_key
+        return (key1 > key2) - (key1 < key2)
 
     def _on_material_filter_clear(self, sender, combobox):
         self._filters["material"] = None
-        self._filterable.refilter()
+        self._filters["name"] = ""
+        self._name_filter.set_text("")
+        self._apply_filters()
         self._filter_expander.set_expanded(False)
         combobox.set_active_iter(self._materials.get_iter_first())
 
@@ -144,13 +146,22 @@ class Panel(ScreenPanel):
         treeiter = sender.get_active_iter()
         if treeiter is not None:
             model = sender.get_model()
-            self._filters["material"] = model[treeiter][0]
-            self._filterable.refilter()
+            if self._filters.get("material") != model[treeiter][0]:
+                self._filters["material"] = model[treeiter][0]
+                self._apply_filters()
+
+    def _on_name_filter_changed(self, entry):
+        self._filters["name"] = entry.get_text().strip()
+        self._apply_filters()
+
+    def _apply_filters(self):
+        # The indexes of the catalogue resolve the filters once, rows are then a set lookup
+        self._visible = self._catalogue.filter(self._filters.get("material"), self._filters.get("name", ""))
+        self._filterable.refilter()
 
     def __init__(self, screen, title):
         title = title or "Spoolman"
         super().__init__(screen, title)
-        self.apiClient = screen.apiclient
         if self._config.get_main_config().getboolean("24htime", True):
             self.timeFormat = '%Y-%m-%d %H:%M'
         else:
@@ -159,8 +170,16 @@ class Panel(ScreenPanel):
         SpoolmanSpool.theme_path = screen.theme
         GObject.type_register(SpoolmanSpool)
         self._filters = {}
+        self._visible = None
         self._model = Gtk.TreeStore(SpoolmanSpool.__gtype__)
+        # Tree iters of the model by spool id, so changes are applied row by row
+        self._rows = {}
         self._materials = Gtk.ListStore(str, str)
+        self._material_names = None
+        self._refresh_timer = None
+        if self._printer.spoolman_catalogue is None:
+            self._printer.spoolman_catalogue = SpoolmanCatalogue()
+        self._catalogue = self._printer.spoolman_catalogue
 
         self._filterable = self._model.filter_new()
         self._filterable.set_visible_func(self._filter_spools)
@@ -234,13 +253,21 @@ class Panel(ScreenPanel):
 
         filter_box.add(row)
 
+        row = Gtk.ListBoxRow()
+        hbox = Gtk.Box(spacing=5)
+        row.add(hbox)
+        self._name_filter = Gtk.Entry(hexpand=True)
+        self._name_filter.connect("changed", self._on_name_filter_changed)
+        self._name_filter.connect("focus-in-event", self._screen.show_keyboard)
+        hbox.pack_start(Gtk.Label(_("Name")), False, True, 0)
+        hbox.pack_start(self._name_filter, True, True, 0)
+        filter_box.add(row)
+
         self.main = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, vexpand=True)
         self.main.pack_start(sbox, False, False, 0)
         self.main.pack_start(self._filter_expander, False, True, 0)
         self.main.pack_start(self.scroll, True, True, 0)
 
-        self.load_spools()
-        self.get_active_spool()
         self._treeview = Gtk.TreeView(model=sortable, headers_visible=False, show_expanders=False)
 
         text_renderer = Gtk.CellRendererText(wrap_width=self._gtk.content_width / 4)
@@ -307,11 +334,10 @@ class Panel(ScreenPanel):
         self.content.add(self.main)
 
     def _filter_spools(self, model, i, data):
-        spool: SpoolmanSpool = model[i][0]
-        matches = True
-        if ("material" in self._filters) and (self._filters["material"] is not None):
-            matches &= spool.filament.material == self._filters["material"]
-        return matches
+        if self._visible is None:
+            return True
+        spool: SpoolmanSpool = model.get_value(i, 0)
+        return spool is not None and spool.id in self._visible
 
     def _set_cell_background(self, cell, spool: SpoolmanSpool):
         cell.set_property('cell-background-rgba', Gdk.RGBA(1, 1, 1, .1) if spool.id == self._active_spool_id else None)
@@ -361,6 +387,17 @@ class Panel(ScreenPanel):
         icon = "arrow-down" if new_sort_order == Gtk.SortType.DESCENDING else "arrow-up"
         widget.set_image(self._gtk.Image(icon, self._gtk.img_scale * self.bts))
 
+    def activate(self):
+        self.get_active_spool()
+        self.refresh_spools()
+        if self._refresh_timer is None:
+            self._refresh_timer = self._screen.timers.add(60, self.refresh_spools, group="display")
+
+    def deactivate(self):
+        if self._refresh_timer is not None:
+            self._screen.timers.remove(self._refresh_timer)
+            self._refresh_timer = None
+
     def process_update(self, action, data):
         if action == "notify_active_spool_set":
             self._active_spool_id = data['spool_id']
@@ -368,51 +405,64 @@ class Panel(ScreenPanel):
                                                store.row_changed(treepath, treeiter)
                                                )
             self._treeview.queue_draw()
+            self._catalogue.refresh_spool(self._screen._ws.klippy, self._active_spool_id, self.update_spools)
 
     def load_spools(self, data=None):
+        self.refresh_spools(full=True)
+
+    def refresh_spools(self, full=False):
         hide_archived = self._config.get_config().getboolean("spoolman", "hide_archived", fallback=True)
-        self._model.clear()
-        self._materials.clear()
-        spools = self.apiClient.post_request("server/spoolman/proxy", json={
-            "request_method": "GET",
-            "path": f"/v1/spool?allow_archived={not hide_archived}",
-        })
-        if not spools or "result" not in spools:
+        self._catalogue.refresh(self._screen._ws.klippy, not hide_archived, self.update_spools, full)
+        return True
+
+    def update_spools(self, changed, removed):
+        if changed is None:
             self._screen.show_popup_message(_("Error trying to fetch spools"))
             return
-
-        materials = []
-        for spool in spools["result"]:
-            spoolObject = SpoolmanSpool(**spool)
-            self._model.append(None, [spoolObject])
-            if not hasattr(spoolObject.filament, 'material'):
-                spoolObject.filament.material = ''
-            elif spoolObject.filament.material not in materials:
-                materials.append(spoolObject.filament.material)
-
-        materials.sort()
+        if not self._rows:
+            # A new panel starts from whatever is already cached
+            changed = set(self._catalogue.spools)
+        for spool_id in removed:
+            if spool_id in self._rows:
+                self._model.remove(self._rows.pop(spool_id))
+        for spool_id in changed:
+            spool = SpoolmanSpool(**self._catalogue.spools[spool_id])
+            if not hasattr(spool.filament, 'material'):
+                spool.filament.material = ''
+            if spool_id in self._rows:
+                self._model.set_value(self._rows[spool_id], 0, spool)
+            else:
+                self._rows[spool_id] = self._model.append(None, [spool])
+        self.update_materials()
+        if changed or removed:
+            self._apply_filters()
+
+    def update_materials(self):
+        materials = sorted(material for material in self._catalogue.materials if material)
+        if materials == self._material_names:
+            return
+        self._material_names = materials
+        self._materials.clear()
         self._materials.append([None, _("All")])
         for material in materials:
             self._materials.append([material, material])
 
     def clear_active_spool(self, sender: Gtk.Button = None):
-        result = self.apiClient.post_request("server/spoolman/spool_id", json={})
-        if not result:
-            self._screen.show_popup_message(_("Error clearing active spool"))
-            return
+        self._screen._ws.klippy.spoolman_set_spool_id(None, self.spool_id_result, _("Error clearing active spool"))
 
     def set_active_spool(self, spool: SpoolmanSpool):
-        result = self.apiClient.post_request("server/spoolman/spool_id", json={
-            "spool_id": spool.id
-        })
-        if not result:
-            self._screen.show_popup_message(_("Error setting active spool"))
-            return
+        self._screen._ws.klippy.spoolman_set_spool_id(spool.id, self.spool_id_result, _("Error setting active spool"))
+
+    def spool_id_result(self, result, method, params, error):
+        if "error" in result:
+            logging.error(f"{method}: {result['error']}")
+            self._screen.show_popup_message(error)
+
+    def get_active_spool(self):
+        self._screen._ws.klippy.spoolman_get_spool_id(self.active_spool_loaded)
 
-    def get_active_spool(self) -> SpoolmanSpool:
-        result = self.apiClient.send_request("server/spoolman/spool_id")
-        if not result:
+    def active_spool_loaded(self, result, method, params):
+        if "result" not in result:
             self._screen.show_popup_message(_("Error getting active spool"))
             return
-        self._active_spool_id = result["spool_id"]
-        return self._active_spool_id
+        self.process_update("notify_active_spool_set", result["result"])
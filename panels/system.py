@@ -127,25 +127,31 @@ class Panel(ScreenPanel):
 
     def process_update(self, action, data):
         if action == "notify_proc_stat_update":
-            self.labels["cpu_usage"].set_label(
+            self.cache.set_label(
+                self.labels["cpu_usage"],
                 f'CPU: {data["system_cpu_usage"]["cpu"]:.0f}%'
             )
-            self.scales["cpu_usage"].set_fraction(
+            self.cache.set_fraction(
+                self.scales["cpu_usage"],
                 float(data["system_cpu_usage"]["cpu"]) / 100
             )
             for i in range(self.cpu_count):
-                self.labels[f"cpu_usage_{i}"].set_label(
+                self.cache.set_label(
+                    self.labels[f"cpu_usage_{i}"],
                     f'CPU {i}: {data["system_cpu_usage"][f"cpu{i}"]:.0f}%'
                 )
-                self.scales[f"cpu_usage_{i}"].set_fraction(
+                self.cache.set_fraction(
+                    self.scales[f"cpu_usage_{i}"],
                     float(data["system_cpu_usage"][f"cpu{i}"]) / 100
                 )
 
-            self.labels["memory_usage"].set_label(
+            self.cache.set_label(
+                self.labels["memory_usage"],
                 _("Memory")
                 + f': {(data["system_memory"]["used"] / data["system_memory"]["total"]) * 100:.0f}%'
             )
-            self.scales["memory_usage"].set_fraction(
+            self.cache.set_fraction(
+                self.scales["memory_usage"],
                 float(data["system_memory"]["used"])
                 / float(data["system_memory"]["total"])
             )
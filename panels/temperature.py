@@ -212,11 +212,11 @@ class Panel(ScreenPanel):
             self.labels["da"].show()
             if self.graph_update is None:
                 # This has a high impact on load
-                self.graph_update = GLib.timeout_add_seconds(5, self.update_graph)
+                self.graph_update = self._screen.timers.add(5, self.update_graph, group="display")
         elif self.labels["da"] in self.left_panel:
             self.left_panel.remove(self.labels["da"])
             if self.graph_update is not None:
-                GLib.source_remove(self.graph_update)
+                self._screen.timers.remove(self.graph_update)
                 self.graph_update = None
 
     def activate(self):
@@ -226,7 +226,7 @@ class Panel(ScreenPanel):
 
     def deactivate(self):
         if self.graph_update is not None:
-            GLib.source_remove(self.graph_update)
+            self._screen.timers.remove(self.graph_update)
             self.graph_update = None
         if self.active_heater is not None:
             self.hide_numpad()
@@ -215,7 +215,7 @@ class Panel(ScreenPanel):
             logging.debug(f"Using zero reference position: {self.zero_ref}")
             return self.zero_ref[0] - self.x_offset, self.zero_ref[1] - self.y_offset
 
-        if ("safe_z_home" in self._printer.get_config_section_list() and
+        if (self._printer.config_section_exists("safe_z_home") and
                 "Z_ENDSTOP_CALIBRATE" not in self._printer.available_commands):
             return self._get_safe_z()
         if self.mesh_radius or "delta" in self._printer.get_config_section("printer")['kinematics']:
@@ -250,6 +250,12 @@ class Panel(ScreenPanel):
         logging.debug(f"Probe in the center X:{mid_x} Y:{mid_y}")
         return mid_x - self.x_offset, mid_y - self.y_offset
 
+    def subscriptions(self):
+        return {
+            "gcode_move": ["gcode_position"],
+            "toolhead": ["homed_axes"],
+        }
+
     def activate(self):
         if self._printer.get_stat("manual_probe", "is_active"):
             self.buttons_calibrating()
@@ -1,4 +1,8 @@
 #!/usr/bin/python
+from time import monotonic
+
+# (event, time) pairs for the startup timing report
+startup_times = [("start", monotonic())]
 
 import argparse
 import gc
@@ -15,21 +19,27 @@ import gi
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gtk, Gdk, GLib, Pango
 from importlib import import_module
-from jinja2 import Environment
 from signal import SIGTERM
 from datetime import datetime
+from functools import partial
 
 from ks_includes import functions
+from ks_includes.dpms import DisplayPower, DPMS_State
 from ks_includes.KlippyWebsocket import KlippyWebsocket
 from ks_includes.KlippyRest import KlippyRest
 from ks_includes.files import KlippyFiles
 from ks_includes.KlippyGtk import KlippyGtk
+from ks_includes.preloader import PanelPreloader
 from ks_includes.printer import Printer
+from ks_includes.ratelimiter import StatusRateLimiter, DEFAULT_LIMITS
+from ks_includes.timerwheel import TimerWheel
 from ks_includes.widgets.keyboard import Keyboard
 from ks_includes.widgets.prompts import Prompt
 from ks_includes.config import KlipperScreenConfig
 from panels.base_panel import BasePanel
 
+startup_times.append(("imports", monotonic()))
+
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 
 klipperscreendir = pathlib.Path(__file__).parent.resolve()
@@ -58,6 +68,7 @@ class KlipperScreen(Gtk.Window):
     files = None
     keyboard = None
     panels = {}
+    pinned_panels = ("splash_screen", "main_menu")
     popup_message = None
     screensaver = None
     printers = printer = None
@@ -72,6 +83,7 @@ class KlipperScreen(Gtk.Window):
     windowed = False
     notification_log = []
     prompt = None
+    subscribed = None
 
     def __init__(self, args):
         self.server_info = None
@@ -83,6 +95,10 @@ class KlipperScreen(Gtk.Window):
         GLib.set_prgname('KlipperScreen')
         self.blanking_time = 600
         self.use_dpms = True
+        self.dpms = DisplayPower()
+        self.dpms_monitor = self.dpms_state = None
+        self.dpms_interval = 1
+        self.dpms_max_interval = 4
         self.apiclient = None
         self.dialogs = []
         self.confirm = None
@@ -93,10 +109,19 @@ class KlipperScreen(Gtk.Window):
 
         self._config = KlipperScreenConfig(configfile, self)
         self.lang_ltr = set_text_direction(self._config.get_main_config().get("language", None))
-        self.env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
-        self.env.install_gettext_translations(self._config.get_lang())
+        self.env = None
+        self.templates = {}
+        self.rendered = {}
+        self.preloader = PanelPreloader()
+        self.timers = TimerWheel()
+        self.panel_cache_size = self._config.get_main_config().getint("panel_cache_size", 12)
+        self.rate_limiter = StatusRateLimiter(
+            self._rate_limited_update,
+            StatusRateLimiter.parse_limits(self._config.get_main_config().get("status_rate_limits", DEFAULT_LIMITS))
+        )
 
         self.connect("key-press-event", self._key_press_event)
+        self.first_frame_handler = self.connect_after("draw", self.first_frame)
         self.connect("configure_event", self.update_size)
         display = Gdk.Display.get_default()
         monitor_amount = Gdk.Display.get_n_monitors(display)
@@ -167,7 +192,26 @@ class KlipperScreen(Gtk.Window):
         self.base_panel.activate()
         self.set_screenblanking_timeout(self._config.get_main_config().get('screen_blanking'))
         self.log_notification("KlipperScreen Started", 1)
-        self.initial_connection()
+        # Connecting is left for after the first frame
+        GLib.idle_add(self.initial_connection)
+
+    def first_frame(self, *args):
+        self.disconnect(self.first_frame_handler)
+        self.first_frame_handler = None
+        self.mark_startup("first frame")
+        return False
+
+    @staticmethod
+    def mark_startup(event):
+        # The report is logged once, when the first printer is connected
+        if startup_times[-1][0] == "connected":
+            return
+        startup_times.append((event, monotonic()))
+        if event == "connected":
+            start = startup_times[0][1]
+            logging.info(
+                "Startup timing: " + ", ".join(f"{name}: {when - start:.2f}s" for name, when in startup_times[1:])
+            )
 
     def state_execute(self, state, callback):
         self.close_screensaver()
@@ -190,7 +234,7 @@ class KlipperScreen(Gtk.Window):
             "shutdown": self.state_shutdown
         }
         for printer in self.printers:
-            printer["data"] = Printer(self.state_execute, state_callbacks)
+            printer["data"] = Printer(self.state_execute, state_callbacks, self.timers)
         default_printer = self._config.get_main_config().get('default_printer')
         logging.debug(f"Default printer: {default_printer}")
         if [True for p in self.printers if default_printer in p]:
@@ -201,6 +245,7 @@ class KlipperScreen(Gtk.Window):
         else:
             self.base_panel.show_printer_select(True)
             self.show_printer_select()
+        return False
 
     def close_websocket(self):
         self._ws.close()
@@ -232,6 +277,9 @@ class KlipperScreen(Gtk.Window):
             self.printers[ind][name]["moonraker_port"],
             self.printers[ind][name]["moonraker_api_key"],
         )
+        self.rate_limiter.clear()
+        self.rendered.clear()
+        self.preloader.cancel()
         self._ws = KlippyWebsocket(
             {
                 "on_connect": self.websocket_connected,
@@ -252,48 +300,62 @@ class KlipperScreen(Gtk.Window):
         self.printer_initializing(_("Connecting to %s") % name, True)
         self.connect_to_moonraker()
 
-    def ws_subscribe(self):
-        requested_updates = {
-            "objects": {
-                "bed_mesh": ["profile_name", "mesh_max", "mesh_min", "probed_matrix", "profiles"],
-                "configfile": ["config"],
-                "display_status": ["progress", "message"],
-                "fan": ["speed"],
-                "gcode_move": ["extrude_factor", "gcode_position", "homing_origin", "speed_factor", "speed"],
-                "idle_timeout": ["state"],
-                "pause_resume": ["is_paused"],
-                "print_stats": ["print_duration", "total_duration", "filament_used", "filename", "state", "message",
-                                "info"],
-                "toolhead": ["homed_axes", "estimated_print_time", "print_time", "position", "extruder",
-                             "max_accel", "minimum_cruise_ratio", "max_velocity", "square_corner_velocity"],
-                "virtual_sdcard": ["file_position", "is_active", "progress"],
-                "webhooks": ["state", "state_message"],
-                "firmware_retraction": ["retract_length", "retract_speed", "unretract_extra_length", "unretract_speed"],
-                "motion_report": ["live_position", "live_velocity", "live_extruder_velocity"],
-                "exclude_object": ["current_object", "objects", "excluded_objects"],
-                "manual_probe": ['is_active'],
-                "screws_tilt_adjust": ['results', 'error'],
-            }
+    def base_subscriptions(self):
+        # Objects needed regardless of the visible panels (printer state, auto-opening panels)
+        requested = {
+            "configfile": ["config"],
+            "display_status": ["progress", "message"],
+            "idle_timeout": ["state"],
+            "pause_resume": ["is_paused"],
+            "print_stats": ["print_duration", "total_duration", "filament_used", "filename", "state", "message",
+                            "info"],
+            "virtual_sdcard": ["file_position", "is_active", "progress"],
+            "webhooks": ["state", "state_message"],
+            "manual_probe": ['is_active'],
+            "screws_tilt_adjust": ['results', 'error'],
         }
+        # The temperature store is fed from the subscription
         for extruder in self.printer.get_tools():
-            requested_updates['objects'][extruder] = [
-                "target", "temperature", "pressure_advance", "smooth_time", "power"]
+            requested[extruder] = ["target", "temperature", "power"]
         for h in self.printer.get_heaters():
-            requested_updates['objects'][h] = ["target", "temperature", "power"]
+            requested[h] = ["target", "temperature", "power"]
         for t in self.printer.get_temp_sensors():
-            requested_updates['objects'][t] = ["temperature"]
+            requested[t] = ["temperature"]
         for f in self.printer.get_temp_fans():
-            requested_updates['objects'][f] = ["target", "temperature"]
-        for f in self.printer.get_fans():
-            requested_updates['objects'][f] = ["speed"]
-        for f in self.printer.get_filament_sensors():
-            requested_updates['objects'][f] = ["enabled", "filament_detected"]
-        for p in self.printer.get_pwm_tools() + self.printer.get_output_pins():
-            requested_updates['objects'][p] = ["value"]
-        for led in self.printer.get_leds():
-            requested_updates['objects'][led] = ["color_data"]
-
-        self._ws.klippy.object_subscription(requested_updates)
+            requested[f] = ["target", "temperature"]
+        return requested
+
+    def requested_updates(self):
+        objects = self.base_subscriptions()
+        panels = [self.base_panel] + [self.panels[panel] for panel in self._cur_panels if panel in self.panels]
+        for panel in panels:
+            for obj, fields in panel.subscriptions().items():
+                merged = objects.setdefault(obj, [])
+                merged.extend(field for field in fields if field not in merged)
+        return {"objects": objects}
+
+    def ws_subscribe(self):
+        self.subscribed = None
+        self.update_subscriptions()
+
+    def update_subscriptions(self):
+        if self._ws is None or not self._ws.connected:
+            return
+        requested_updates = self.requested_updates()
+        if requested_updates == self.subscribed:
+            return
+        logging.debug(f"Subscribing to: {list(requested_updates['objects'])}")
+        self.subscribed = requested_updates
+        self._ws.klippy.object_subscription(requested_updates, self._subscription_callback)
+
+    def _subscription_callback(self, result, method, params):
+        if "result" not in result or "status" not in result["result"]:
+            logging.error(f"Error subscribing to printer objects: {result}")
+            return
+        # The response contains the current state of the newly subscribed objects
+        status = result["result"]["status"]
+        self.printer.process_update(status)
+        self.process_update("notify_status_update", status)
 
     @staticmethod
     def _load_panel(panel):
@@ -330,9 +392,28 @@ class KlipperScreen(Gtk.Window):
                 self.panels_reinit.remove(panel_name)
             self._cur_panels.append(panel_name)
             self.attach_panel(panel_name)
+            self.evict_panels()
         except Exception as e:
             logging.exception(f"Error attaching panel:\n{e}\n\n{traceback.format_exc()}")
 
+    def evict_panels(self):
+        # Drops the least recently used panels that are not in use, panel_cache_size 0 keeps every panel
+        if self.panel_cache_size < 1:
+            return
+        excess = len(self.panels) - self.panel_cache_size
+        evictable = [
+            name for name in self.panels
+            if name not in self._cur_panels and name not in self.pinned_panels
+        ]
+        for name in evictable[:max(excess, 0)]:
+            logging.debug(f"Evicting panel: {name}")
+            panel = self.panels.pop(name)
+            if name in self.panels_reinit:
+                self.panels_reinit.remove(name)
+            if hasattr(panel, "release"):
+                panel.release()
+            panel.content.destroy()
+
     def set_panel_title(self, title):
         self.base_panel.set_title(title)
 
@@ -341,8 +422,12 @@ class KlipperScreen(Gtk.Window):
             # this happens when the first panel needs a reinit
             self.reload_panels()
             return
+        # Most recently used panels are kept at the end
+        self.panels[panel] = self.panels.pop(panel)
         self.base_panel.add_content(self.panels[panel])
         logging.debug(f"Current panel hierarchy: {' > '.join(self._cur_panels)}")
+        if self.initialized:
+            self.update_subscriptions()
         while len(self.panels[panel].menu) > 1:
             self.panels[panel].unload_menu()
         if hasattr(self.panels[panel], "process_update"):
@@ -621,6 +706,8 @@ class KlipperScreen(Gtk.Window):
         close.grab_focus()
         self.screensaver = box
         self.screensaver.show_all()
+        # Nothing that only updates the display needs to run while it's blank
+        self.timers.pause("display")
         self.power_devices(None, self._config.get_main_config().get("screen_off_devices", ""), on=False)
         return False
 
@@ -630,6 +717,7 @@ class KlipperScreen(Gtk.Window):
         logging.debug("Closing Screensaver")
         self.remove(self.screensaver)
         self.screensaver = None
+        self.timers.resume("display")
         self.add(self.base_panel.main_grid)
         if self.use_dpms:
             self.wake_screen()
@@ -641,17 +729,39 @@ class KlipperScreen(Gtk.Window):
         self.show_all()
         self.power_devices(None, self._config.get_main_config().get("screen_on_devices", ""), on=True)
 
+    def start_dpms_monitor(self, interval=1):
+        # There is only one monitor, starting it again replaces it
+        self.stop_dpms_monitor()
+        self.dpms_interval = interval
+        self.dpms_monitor = self.timers.add(interval, self.check_dpms_state)
+
+    def stop_dpms_monitor(self):
+        if self.dpms_monitor is not None:
+            self.timers.remove(self.dpms_monitor)
+            self.dpms_monitor = None
+
     def check_dpms_state(self):
         if not self.use_dpms:
+            self.dpms_monitor = None
             return False
-        state = functions.get_DPMS_state()
-        if state == functions.DPMS_State.Fail:
+        state = self.dpms.get_state()
+        if state == DPMS_State.Fail:
             logging.info("DPMS State FAIL: Stopping DPMS Check")
+            self.dpms_monitor = None
             self.set_dpms(False)
             return False
-        elif state != functions.DPMS_State.On:
+        elif state != DPMS_State.On:
             if self.screensaver is None:
                 self.show_screensaver()
+        # Poll less often while the state is stable, up to dpms_max_interval
+        if state != self.dpms_state:
+            interval = 1
+        else:
+            interval = min(self.dpms_interval * 2, self.dpms_max_interval)
+        self.dpms_state = state
+        if interval != self.dpms_interval:
+            self.start_dpms_monitor(interval)
+            return False
         return True
 
     def wake_screen(self):
@@ -659,7 +769,7 @@ class KlipperScreen(Gtk.Window):
         if self._config.get_main_config().get('screen_blanking') != "off":
             logging.debug("Screen wake up")
             if not self.wayland:
-                os.system("xset -display :0 dpms force on")
+                self.dpms.force_on()
 
     def set_dpms(self, use_dpms):
         self.use_dpms = use_dpms
@@ -675,22 +785,23 @@ class KlipperScreen(Gtk.Window):
 
     def set_screenblanking_timeout(self, time):
         if not self.wayland:
-            os.system("xset -display :0 s off")
+            self.dpms.disable_screensaver()
         self.use_dpms = self._config.get_main_config().getboolean("use_dpms", fallback=True)
 
         if time == "off":
             logging.debug(f"Screen blanking: {time}")
             self.blanking_time = 0
+            self.stop_dpms_monitor()
             if not self.wayland:
-                os.system("xset -display :0 dpms 0 0 0")
+                self.dpms.set_timeouts(0, 0, 0)
             return
 
         self.blanking_time = abs(int(time))
         logging.debug(f"Changing screen blanking to: {self.blanking_time}")
-        if self.use_dpms and functions.dpms_loaded is True:
+        if self.use_dpms and self.dpms.available():
             if not self.wayland:
-                os.system("xset -display :0 +dpms")
-            if functions.get_DPMS_state() == functions.DPMS_State.Fail:
+                self.dpms.enable()
+            if self.dpms.get_state() == DPMS_State.Fail:
                 logging.info("DPMS State FAIL")
                 self.show_popup_message(_("DPMS has failed to load and has been disabled"))
                 self._config.set("main", "use_dpms", "False")
@@ -698,13 +809,15 @@ class KlipperScreen(Gtk.Window):
             else:
                 logging.debug("Using DPMS")
                 if not self.wayland:
-                    os.system(f"xset -display :0 dpms 0 {self.blanking_time} 0")
-                GLib.timeout_add_seconds(1, self.check_dpms_state)
+                    self.dpms.set_timeouts(0, self.blanking_time, 0)
+                self.dpms_state = None
+                self.start_dpms_monitor()
                 return
         # Without dpms just blank the screen
         logging.debug("Not using DPMS")
+        self.stop_dpms_monitor()
         if not self.wayland:
-            os.system("xset -display :0 dpms 0 0 0")
+            self.dpms.set_timeouts(0, 0, 0)
         self.reset_screensaver_timeout()
         return
 
@@ -742,6 +855,7 @@ class KlipperScreen(Gtk.Window):
 
     def state_disconnected(self):
         logging.debug("### Going to disconnected")
+        self.preloader.cancel()
         self.printer.stop_tempstore_updates()
         self.initialized = False
         self.reinit_count = 0
@@ -774,6 +888,21 @@ class KlipperScreen(Gtk.Window):
             return
         self.files.refresh_files()
         self.show_panel("main_menu", remove_all=True, items=self._config.get_menu_items("__main"))
+        self.preload_panels()
+
+    def preload_panels(self):
+        tasks = [(panel, partial(self._load_panel, panel)) for panel in self._config.get_menu_panels()]
+        if self._config.get_main_config().getboolean("preload_panels", False):
+            # The panel most likely to be opened next, job_status is always reinitialized when a print starts
+            tasks.append(("gcodes", partial(self._preload_panel, "gcodes")))
+        self.preloader.start(tasks)
+
+    def _preload_panel(self, panel):
+        if not self.initialized or panel in self.panels:
+            return
+        logging.debug(f"Preloading panel: {panel}")
+        # The panel is reused by show_panel, so it needs the title it would get from the menu
+        self.panels[panel] = self._load_panel(panel).Panel(self, self._config.get_panel_menu_name(panel))
 
     def state_startup(self):
         self.printer_initializing(_("Klipper is attempting to start"))
@@ -796,16 +925,38 @@ class KlipperScreen(Gtk.Window):
     def change_language(self, widget, lang):
         self._config.install_language(lang)
         self.lang_ltr = set_text_direction(lang)
-        self.env.install_gettext_translations(self._config.get_lang())
+        self.env = None
+        self.templates.clear()
+        self.rendered.clear()
         self._config._create_configurable_options(self)
         self._config.set('main', 'language', lang)
         self._config.save_user_config_options()
         self.reload_panels()
 
+    def get_template(self, source):
+        if self.env is None:
+            from jinja2 import Environment  # Deferred, it's slow to import on an SD card
+            self.env = Environment(extensions=["jinja2.ext.i18n"], autoescape=True)
+            self.env.install_gettext_translations(self._config.get_lang())
+        if source not in self.templates:
+            self.templates[source] = self.env.from_string(source)
+        return self.templates[source]
+
+    def render_template(self, source):
+        # Rendered against the printer status data and reused until that data changes
+        version = self.printer.status_version
+        if source in self.rendered and self.rendered[source][0] == version:
+            return self.rendered[source][1]
+        result = self.get_template(source).render(self.printer.get_printer_status_data())
+        self.rendered[source] = (version, result)
+        return result
+
     def reload_panels(self, *args):
         if "printer_select" in self._cur_panels:
             self.show_printer_select()
             return
+        if not self._cur_panels:
+            return
         home = self._cur_panels[0]
         self.panels_reinit = list(self.panels)
         self._remove_all_panels()
@@ -837,6 +988,9 @@ class KlipperScreen(Gtk.Window):
                 self.show_panel("zcalibrate")
             if "screws_tilt_adjust" in data and 'bed_level' not in self._cur_panels:
                 self.show_panel("bed_level")
+            data = self.rate_limiter.filter(data)
+            if not data:
+                return
         elif action == "notify_filelist_changed":
             if self.files is not None:
                 self.files.process_update(data)
@@ -882,6 +1036,10 @@ class KlipperScreen(Gtk.Window):
                     )
         self.process_update(action, data)
 
+    def _rate_limited_update(self, data):
+        if self.printer.state != "shutdown":
+            self.process_update("notify_status_update", data)
+
     def process_update(self, *args):
         self.base_panel.process_update(*args)
         if self._cur_panels and hasattr(self.panels[self._cur_panels[-1]], "process_update"):
@@ -894,8 +1052,7 @@ class KlipperScreen(Gtk.Window):
         ]
 
         try:
-            j2_temp = self.env.from_string(text)
-            text = j2_temp.render()
+            text = self.get_template(text).render()
         except Exception as e:
             logging.debug(f"Error parsing jinja for confirm_send_action\n{e}\n\n{traceback.format_exc()}")
 
@@ -1084,6 +1241,7 @@ class KlipperScreen(Gtk.Window):
         self.files.set_gcodes_path()
 
         logging.info("Printer initialized")
+        self.mark_startup("connected")
         self.initialized = True
         self.reinit_count = 0
         self.initializing = False
@@ -276,6 +276,12 @@ add_desktop_file()
     sudo cp "$SCRIPTPATH"/../styles/icon.svg /usr/share/icons/hicolor/scalable/apps/KlipperScreen.svg
 }
 
+cache_version()
+{
+    echo_text "Caching the KlipperScreen version"
+    (cd "$KSPATH" && "${KSENV}"/bin/python -c "from ks_includes import functions; functions.write_version_file()")
+}
+
 start_KlipperScreen()
 {
     echo_text "Starting service..."
@@ -343,6 +349,7 @@ create_policy
 fix_fbturbo
 add_desktop_file
 install_network_manager
+cache_version
 if [ -z "$START" ] || [ "$START" -eq 0 ]; then
     echo_ok "KlipperScreen was installed"
 else